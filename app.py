@@ -1,45 +1,360 @@
 """Flask application for Spencer's Toolkit."""
 
+import multiprocessing
 import os
+import tempfile
+import threading
 import time
 import traceback
 import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 
 import json
 
+import disk_cache
 import sec_client
 import xbrl_parser
 import html_parser
+import ixbrl
 import excel_builder
 import ppt_builder
+import scan_cache
+import scan_worker
 import value_chain_builder
 
 app = Flask(__name__)
 
-# Load industry data at startup
-_industry_data_path = os.path.join(os.path.dirname(__file__), "industry_data.json")
-with open(_industry_data_path, "r") as _f:
-    _industry_data = json.load(_f)
+_industry_data = None
+_vc_data = None
+_scan_cache = None
+
+
+def _start_server():
+    """Start-up work of a process that serves requests."""
+    global _industry_data, _vc_data, _scan_cache
+
+    # Load industry data at startup
+    _industry_data_path = os.path.join(os.path.dirname(__file__), "industry_data.json")
+    with open(_industry_data_path, "r") as f:
+        _industry_data = json.load(f)
+
+    # Load value chain data at startup
+    _vc_data_path = os.path.join(os.path.dirname(__file__), "value_chain_data.json")
+    with open(_vc_data_path, "r") as f:
+        _vc_data = json.load(f)
+
+    # Cache for scanned tables (scan_id -> metadata + packed table blobs),
+    # shared by all workers, so we don't have to re-fetch filings on generate
+    _scan_cache = scan_cache.from_env(sec_client.CACHE_DIR)
+
+    # Load the company ticker snapshot now (refreshing it in the background if
+    # stale) so this worker's first search doesn't wait on the SEC download
+    sec_client.warm_company_tickers()
+
+
+# Started as `python app.py`, this file is the main module, and parse
+# processes (see _get_parse_pool) re-run it as __mp_main__ when they start;
+# they only need scan_worker, so they skip the server's start-up work.
+if __name__ != "__mp_main__":
+    _start_server()
+
+
+# Scan pipeline: filings are downloaded on a thread pool (the shared rate
+# limiter in sec_client keeps us within SEC's budget) and each downloaded
+# document is handed to a process pool for parsing, so CPU-bound table
+# extraction runs on all cores instead of holding this worker's GIL.
+#
+# Parse processes are started by a forkserver, not forked from this worker:
+# a fork taken while a download thread holds a lock (a threading lock, or
+# the rate limiter's flock) would carry that lock for the child's whole life.
+# Every gunicorn worker has its own pool, so the default stays small.
+_SCAN_DOWNLOAD_THREADS = int(os.environ.get("SCAN_DOWNLOAD_THREADS", 8))
+_SCAN_PARSE_PROCESSES = int(os.environ.get("SCAN_PARSE_PROCESSES", min(2, os.cpu_count() or 1)))
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    """Return the worker's parse process pool, or None to parse in-thread."""
+    global _parse_pool
+    if _SCAN_PARSE_PROCESSES <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                try:
+                    context = multiprocessing.get_context("forkserver")
+                except ValueError:
+                    return None  # no forkserver (Windows): parse in the download threads
+                context.set_forkserver_preload(["scan_worker"])
+                _parse_pool = ProcessPoolExecutor(max_workers=_SCAN_PARSE_PROCESSES, mp_context=context)
+    return _parse_pool
+
+
+def _discard_parse_pool(pool):
+    """Drop a broken pool (e.g. a child was OOM-killed); the next scan starts a new one."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_html(html_content, pool):
+    """Parse a document in the pool, or in this thread if there is none or it broke."""
+    if pool is not None:
+        try:
+            return pool.submit(scan_worker.parse_filing_html, html_content).result()
+        except BrokenProcessPool:
+            _discard_parse_pool(pool)
+    return scan_worker.parse_filing_html(html_content)
+
+
+_EMPTY_SCAN = {"shapes": [], "packed": (b"", [])}
+
+
+# Parsed tables per filing document, kept on disk by every worker. Filing
+# HTML never changes once filed, so a document is only downloaded and parsed
+# once per parser version; later scans of it, by anyone, read the store.
+TABLE_STORE_DIR = os.environ.get("TABLE_STORE_DIR", os.path.join(sec_client.CACHE_DIR, "tables"))
+TABLE_STORE_MAX_BYTES = int(os.environ.get("TABLE_STORE_MAX_BYTES", 256 * 1024 * 1024))
+_table_store = disk_cache.DiskCache(TABLE_STORE_DIR, TABLE_STORE_MAX_BYTES)
+
+
+def _table_store_key(filing):
+    return f"{html_parser.PARSER_VERSION}:{filing.get('accession', '')}:{filing.get('doc_url', '')}"
+
+
+def _stored_scan(filing):
+    """Return the stored scanned result for a filing's document, or None.
+
+    An entry that cannot be read, or whose offsets run past its blob (a
+    truncated write), counts as a miss: the filing is downloaded again.
+    """
+    try:
+        blob, meta = _table_store.get(_table_store_key(filing))
+        if blob is None:
+            return None
+        shapes, offsets = meta["shapes"], meta["offsets"]
+        if len(shapes) != len(offsets) or any(start + length > len(blob) for start, length in offsets):
+            return None
+    except Exception:
+        traceback.print_exc()
+        return None
+    return {"shapes": shapes, "packed": (blob, offsets)}
+
+
+def _store_scan(filing, scanned):
+    """Store a filing's scanned tables, and its inline XBRL facts if it has any.
+
+    The store is only a cache: a failure to write it (disk full, a locked
+    database) is logged and the scan goes on with the tables it parsed.
+    """
+    key = _table_store_key(filing)
+    try:
+        facts = scanned.get("facts")
+        if facts:
+            company_facts = facts.company_facts(
+                form=filing.get("type", ""),
+                filed=filing.get("date", ""),
+                accession=filing.get("accession", ""),
+            )
+            _table_store.put(key + ":facts", zlib.compress(json.dumps(company_facts).encode("utf-8")))
+        blob, offsets = scanned["packed"]
+        _table_store.put(key, blob, {"shapes": scanned["shapes"], "offsets": offsets})
+    except Exception:
+        traceback.print_exc()
+
+
+def _single_filing_facts(filings):
+    """companyfacts-shaped facts from the inline XBRL of a lone scanned filing.
+
+    Returns None, meaning use companyfacts, unless exactly one filing was
+    selected and its scan stored facts covering the statements.
+    """
+    if len(filings) != 1:
+        return None
+    try:
+        blob, _ = _table_store.get(_table_store_key(filings[0]) + ":facts")
+        if blob is None:
+            return None
+        facts = json.loads(zlib.decompress(blob))
+        us_gaap = facts["facts"].get("us-gaap", {})
+    except Exception:
+        traceback.print_exc()
+        return None
+    if not any(concept in us_gaap for concept in xbrl_parser.statement_concepts()):
+        return None
+    return facts
+
+
+def _fetch_and_parse(filing, pool):
+    """Download one filing and parse it, or read its stored tables.
+
+    Returns (scanned, timing dict).
+    """
+    timing = {"accession": filing.get("accession", ""), "download_ms": 0, "parse_ms": 0}
+    scanned = _stored_scan(filing)
+    if scanned is not None:
+        timing["stored"] = True
+        timing["tables"] = len(scanned["shapes"])
+        return scanned, timing
+
+    try:
+        start = time.perf_counter()
+        html_content = sec_client.get_filing_html(filing["doc_url"])
+        timing["download_ms"] = round((time.perf_counter() - start) * 1000)
+
+        scanned, parse_secs = _parse_html(html_content, pool)
+        timing["parse_ms"] = round(parse_secs * 1000)
+    except Exception as e:
+        timing["error"] = str(e)
+        scanned = _EMPTY_SCAN
+    else:
+        _store_scan(filing, scanned)
+    timing["tables"] = len(scanned["shapes"])
+    return scanned, timing
+
+
+def _iter_scanned(filings):
+    """Download and parse filings concurrently, yielding each as it is done.
+
+    Yields (filing, scanned, timing) for every filing with a doc_url, in the
+    order they finish; see _fetch_and_parse. Closing the generator early
+    cancels the filings not started yet.
+    """
+    filings = [f for f in filings if f.get("doc_url")]
+    if not filings:
+        return
+
+    pool = _get_parse_pool()
+    threads = max(1, min(_SCAN_DOWNLOAD_THREADS, len(filings)))
+    executor = ThreadPoolExecutor(max_workers=threads)
+    try:
+        futures = {executor.submit(_fetch_and_parse, f, pool): f for f in filings}
+        for future in as_completed(futures):
+            scanned, timing = future.result()
+            yield futures[future], scanned, timing
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_filings(filings):
+    """Download and parse filings concurrently.
+
+    Returns {accession: (scanned, timing)} for every filing with a doc_url,
+    where scanned holds the table shapes and the packed table blob. A filing
+    that fails to download or parse maps to no tables.
+    """
+    return {f.get("accession", ""): (scanned, timing) for f, scanned, timing in _iter_scanned(filings)}
+
+
+def _streamed_filing_lines(filing, packed_by_filing):
+    """NDJSON lines for one filing, its tables parsed straight off the download.
+
+    Yields a table line as each table closes, then the filing's timing
+    line; the filing's packed tables are added to packed_by_filing.
+    """
+    accession = filing.get("accession", "")
+    timing = {"accession": accession, "first_table_ms": None, "total_ms": 0}
+    start = time.perf_counter()
+    stored = _stored_scan(filing)
+    if stored is not None:
+        for i, shape in enumerate(stored["shapes"]):
+            yield json.dumps({"table": _table_summary(filing, i, shape)}) + "\n"
+        timing["stored"] = True
+        timing["tables"] = len(stored["shapes"])
+        packed_by_filing[accession] = stored["packed"]
+        yield json.dumps({"filing": timing}) + "\n"
+        return
+
+    packer = scan_cache.TablePacker()
+    shapes = []
+    facts = ixbrl.FactCollector()
+    try:
+        chunks, encoding, wait = sec_client.stream_filing_html(filing["doc_url"])
+        timing["rate_limit_ms"] = round(wait * 1000)
+        for table in html_parser.iter_tables(chunks, encoding, facts=facts):
+            if timing["first_table_ms"] is None:
+                timing["first_table_ms"] = round((time.perf_counter() - start) * 1000)
+            shape = scan_worker.table_shape(table)
+            yield json.dumps({"table": _table_summary(filing, len(shapes), shape)}) + "\n"
+            packer.add(table)
+            shapes.append(shape)
+    except Exception as e:
+        timing["error"] = str(e)
+
+    timing["total_ms"] = round((time.perf_counter() - start) * 1000)
+    timing["tables"] = len(shapes)
+    packed_by_filing[accession] = packer.packed()
+    if "error" not in timing:
+        _store_scan(filing, {"shapes": shapes, "packed": packed_by_filing[accession], "facts": facts})
+    yield json.dumps({"filing": timing}) + "\n"
+
+
+def _scanned_filing_lines(filings, packed_by_filing):
+    """NDJSON lines for filings scanned concurrently, each sent once it is parsed."""
+    for filing, scanned, timing in _iter_scanned(filings):
+        for i, shape in enumerate(scanned["shapes"]):
+            yield json.dumps({"table": _table_summary(filing, i, shape)}) + "\n"
+        packed_by_filing[filing.get("accession", "")] = scanned["packed"]
+        yield json.dumps({"filing": timing}) + "\n"
+
+
+def _load_selected_tables(scan_id, filings, selected_indices):
+    """Load the user's selected tables. Returns {accession: {index: table}}.
+
+    Tables come from the scan cache; any filing whose selection did not all
+    load (no cached scan, or the entry expired or was evicted since the
+    scan) is fetched and parsed again, then just its selection inflated.
+    """
+    cached = _scan_cache.get(scan_id) is not None
+    loaded = {}
+    missing = []
+    for filing in filings:
+        accession = filing.get("accession", "")
+        indices = selected_indices.get(accession)
+        if not indices:
+            continue
+        if cached:
+            loaded[accession] = _scan_cache.get_tables(scan_id, accession, indices)
+        if not set(indices) <= loaded.get(accession, {}).keys():
+            missing.append(filing)
+
+    scanned = _scan_filings(missing)
+    for filing in missing:
+        accession = filing.get("accession", "")
+        blob, offsets = scanned.get(accession, (_EMPTY_SCAN, None))[0]["packed"]
+        loaded[accession] = {i: scan_cache.unpack_table(blob, offsets[i])
+                             for i in selected_indices[accession] if i < len(offsets)}
+    return loaded
+
+
+# Generated workbooks and decks are built straight into a spooled buffer:
+# held in memory up to OUTPUT_SPOOL_BYTES, rolled over to an anonymous temp
+# file beyond that. send_file closes the buffer once the response is sent,
+# which also removes any temp file, so nothing is left behind on disk.
+_OUTPUT_SPOOL_BYTES = int(os.environ.get("OUTPUT_SPOOL_BYTES", 32 * 1024 * 1024))
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PPTX_MIMETYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
 
-# Load value chain data at startup
-_vc_data_path = os.path.join(os.path.dirname(__file__), "value_chain_data.json")
-with open(_vc_data_path, "r") as _f:
-    _vc_data = json.load(_f)
 
-# In-memory cache for scanned tables (scan_id -> data)
-# So we don't have to re-fetch filings on generate
-_scan_cache = {}
-_CACHE_TTL = 600  # 10 minutes
+def _output_buffer():
+    return tempfile.SpooledTemporaryFile(max_size=_OUTPUT_SPOOL_BYTES)
 
 
-def _clean_cache():
-    """Remove expired cache entries."""
-    now = time.time()
-    expired = [k for k, v in _scan_cache.items() if now - v["time"] > _CACHE_TTL]
-    for k in expired:
-        del _scan_cache[k]
+def _send_output(output, filename, mimetype):
+    """Send a built document from its buffer as an attachment."""
+    size = output.seek(0, os.SEEK_END)
+    output.seek(0)
+    response = send_file(output, as_attachment=True, download_name=filename, mimetype=mimetype)
+    response.content_length = size
+    return response
 
 
 @app.route("/")
@@ -78,11 +393,45 @@ def api_filings():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/stats")
+def api_stats():
+    """Report SEC connection reuse, rate-limit waits and cache use for this worker."""
+    return jsonify({
+        "sec_pool": sec_client.get_pool_stats(),
+        "sec_rate_limit": sec_client.get_rate_limit_stats(),
+        "sec_cache": sec_client.get_cache_stats(),
+        "scan_cache": _scan_cache.stats(),
+    })
+
+
+def _table_summary(filing, index, shape):
+    """Metadata for one scanned table, as listed to the user for selection."""
+    accession = filing.get("accession", "")
+    return {
+        "id": f"{accession}:{index}",
+        "title": shape.get("title") or f"Table {index + 1}",
+        "filing_type": filing.get("type", ""),
+        "filing_date": filing.get("date", ""),
+        "accession": accession,
+        "table_index": index,
+        "rows": shape["rows"],
+        "cols": shape["cols"],
+    }
+
+
+def _selected_indices(table_ids):
+    """Group "accession:index" table ids into {accession: sorted indices}."""
+    selected = {}
+    for table_id in table_ids:
+        accession, _, index = str(table_id).rpartition(":")
+        if accession and index.isdigit():
+            selected.setdefault(accession, set()).add(int(index))
+    return {accession: sorted(indices) for accession, indices in selected.items()}
+
+
 @app.route("/api/scan", methods=["POST"])
 def api_scan():
     """Fetch selected filings, extract all tables, return table list for user to pick from."""
-    _clean_cache()
-
     data = request.get_json()
     if not data:
         return jsonify({"error": "No data provided"}), 400
@@ -94,45 +443,35 @@ def api_scan():
         return jsonify({"error": "CIK and at least one filing are required"}), 400
 
     try:
-        # Fetch and parse HTML for each filing
+        # Fetch and parse HTML for all filings concurrently
         all_tables = []  # flat list with filing metadata attached
-        tables_by_filing = {}
+        packed_by_filing = {}
+        timings = []
+        scanned = _scan_filings(selected_filings)
 
         for filing in selected_filings:
-            doc_url = filing.get("doc_url", "")
             accession = filing.get("accession", "")
-            if doc_url:
-                try:
-                    html_content = sec_client.get_filing_html(doc_url)
-                    tables = html_parser.extract_tables(html_content)
-                    tables_by_filing[accession] = tables
-
-                    for i, table in enumerate(tables):
-                        all_tables.append({
-                            "id": f"{accession}:{i}",
-                            "title": table.get("title") or f"Table {i + 1}",
-                            "filing_type": filing.get("type", ""),
-                            "filing_date": filing.get("date", ""),
-                            "accession": accession,
-                            "table_index": i,
-                            "rows": len(table.get("rows", [])),
-                            "cols": len(table.get("rows", [[]])[0]) if table.get("rows") else 0,
-                        })
-                except Exception:
-                    tables_by_filing[accession] = []
-
-        # Cache the full parsed data for generate step
+            if accession not in scanned:
+                continue
+            result, timing = scanned[accession]
+            packed_by_filing[accession] = result["packed"]
+            timings.append(timing)
+
+            for i, shape in enumerate(result["shapes"]):
+                all_tables.append(_table_summary(filing, i, shape))
+
+        # Cache the packed tables for the generate step; rows stay compressed
+        # until the user's selected tables are loaded
         scan_id = str(uuid.uuid4())
-        _scan_cache[scan_id] = {
-            "time": time.time(),
-            "tables_by_filing": tables_by_filing,
+        _scan_cache.put(scan_id, {
             "filings": selected_filings,
             "cik": cik,
-        }
+        }, packed_by_filing)
 
         return jsonify({
             "scan_id": scan_id,
             "tables": all_tables,
+            "timings": timings,
         })
 
     except Exception as e:
@@ -140,6 +479,48 @@ def api_scan():
         return jsonify({"error": f"Scan failed: {str(e)}"}), 500
 
 
+@app.route("/api/scan/stream", methods=["POST"])
+def api_scan_stream():
+    """Streaming variant of /api/scan that sends tables as they are parsed.
+
+    Responds with newline-delimited JSON: {"table": ...} lines, a
+    {"filing": ...} timing line after each filing's tables, and a final
+    {"scan_id": ...} line. A lone filing is parsed straight off the
+    response stream, so its first tables are sent before the download
+    finishes and memory stays flat regardless of document size. Several
+    filings go through the /api/scan pipeline (concurrent downloads, the
+    parse process pool) and each filing's tables are sent as soon as it
+    is parsed, in the order the filings finish. Filings already in the
+    table store are listed from it without downloading.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    cik = data.get("cik", "")
+    selected_filings = data.get("filings", [])
+
+    if not cik or not selected_filings:
+        return jsonify({"error": "CIK and at least one filing are required"}), 400
+
+    def generate():
+        packed_by_filing = {}
+        filings = [f for f in selected_filings if f.get("doc_url")]
+        if len(filings) == 1:
+            yield from _streamed_filing_lines(filings[0], packed_by_filing)
+        else:
+            yield from _scanned_filing_lines(filings, packed_by_filing)
+
+        scan_id = str(uuid.uuid4())
+        _scan_cache.put(scan_id, {
+            "filings": selected_filings,
+            "cik": cik,
+        }, packed_by_filing)
+        yield json.dumps({"scan_id": scan_id}) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
 @app.route("/api/generate", methods=["POST"])
 def api_generate():
     data = request.get_json()
@@ -151,57 +532,39 @@ def api_generate():
     ticker = data.get("ticker", "")
     selected_filings = data.get("filings", [])
     scan_id = data.get("scan_id", "")
-    selected_table_ids = set(data.get("selected_tables", []))
+    selected_indices = _selected_indices(data.get("selected_tables", []))
     single_sheet = data.get("single_sheet", False)
     brand_colors = data.get("brand_colors")
 
     if not cik or not selected_filings:
         return jsonify({"error": "CIK and at least one filing are required"}), 400
 
+    output = _output_buffer()
     try:
-        # 1. Fetch XBRL data for core financials
-        xbrl_facts = sec_client.get_xbrl_facts(cik)
+        # 1. XBRL data for core financials: a single filing's own inline XBRL
+        # facts, stored when it was scanned, otherwise the company's facts
+        xbrl_facts = _single_filing_facts(selected_filings)
+        if xbrl_facts is None:
+            xbrl_facts = sec_client.get_xbrl_facts(cik, concepts=xbrl_parser.statement_concepts())
         xbrl_data = xbrl_parser.extract_financials(xbrl_facts, selected_filings)
 
         # 2. Get HTML tables — from cache if available, otherwise re-fetch
         selected_tables = []
-        cached = _scan_cache.get(scan_id)
+        loaded = _load_selected_tables(scan_id, selected_filings, selected_indices)
 
-        if cached:
-            # Pull only the user-selected tables from cache
-            for filing in selected_filings:
-                accession = filing.get("accession", "")
-                tables = cached["tables_by_filing"].get(accession, [])
-                for i, table in enumerate(tables):
-                    table_id = f"{accession}:{i}"
-                    if table_id in selected_table_ids:
-                        selected_tables.append({
-                            "table": table,
-                            "filing_type": filing.get("type", ""),
-                            "filing_date": filing.get("date", ""),
-                        })
-        else:
-            # No cache — re-fetch (fallback)
-            for filing in selected_filings:
-                doc_url = filing.get("doc_url", "")
-                accession = filing.get("accession", "")
-                if doc_url:
-                    try:
-                        html_content = sec_client.get_filing_html(doc_url)
-                        tables = html_parser.extract_tables(html_content)
-                        for i, table in enumerate(tables):
-                            table_id = f"{accession}:{i}"
-                            if table_id in selected_table_ids:
-                                selected_tables.append({
-                                    "table": table,
-                                    "filing_type": filing.get("type", ""),
-                                    "filing_date": filing.get("date", ""),
-                                })
-                    except Exception:
-                        pass
+        for filing in selected_filings:
+            accession = filing.get("accession", "")
+            tables = loaded.get(accession, {})
+            for i in selected_indices.get(accession, []):
+                if i in tables:
+                    selected_tables.append({
+                        "table": tables[i],
+                        "filing_type": filing.get("type", ""),
+                        "filing_date": filing.get("date", ""),
+                    })
 
         # 3. Build Excel workbook
-        filepath, filename = excel_builder.build_workbook(
+        output, filename = excel_builder.build_workbook(
             company_name=company_name,
             ticker=ticker,
             xbrl_data=xbrl_data,
@@ -209,16 +572,13 @@ def api_generate():
             selected_filings=selected_filings,
             single_sheet=single_sheet,
             brand_colors=brand_colors,
+            output=output,
         )
 
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+        return _send_output(output, filename, XLSX_MIMETYPE)
 
     except Exception as e:
+        output.close()
         traceback.print_exc()
         return jsonify({"error": f"Generation failed: {str(e)}"}), 500
 
@@ -277,20 +637,18 @@ def api_landscape_generate():
     if not industry:
         return jsonify({"error": "Industry not found"}), 404
 
+    output = _output_buffer()
     try:
-        filepath, filename = ppt_builder.build_landscape_ppt(
+        output, filename = ppt_builder.build_landscape_ppt(
             industry=industry,
             selected_sub_ids=sub_industry_ids if sub_industry_ids else None,
+            output=output,
         )
 
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        )
+        return _send_output(output, filename, PPTX_MIMETYPE)
 
     except Exception as e:
+        output.close()
         traceback.print_exc()
         return jsonify({"error": f"PPT generation failed: {str(e)}"}), 500
 
@@ -347,20 +705,18 @@ def api_value_chain_generate():
     if not chain:
         return jsonify({"error": "Value chain not found"}), 404
 
+    output = _output_buffer()
     try:
-        filepath, filename = value_chain_builder.build_value_chain_ppt(
+        output, filename = value_chain_builder.build_value_chain_ppt(
             value_chain=chain,
             scope=scope,
+            output=output,
         )
 
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        )
+        return _send_output(output, filename, PPTX_MIMETYPE)
 
     except Exception as e:
+        output.close()
         traceback.print_exc()
         return jsonify({"error": f"PPT generation failed: {str(e)}"}), 500
 
@@ -0,0 +1,150 @@
+"""Cell styling cost in the Excel writers: per-cell objects vs _StylePool.
+
+Two measurements on a 50-period workbook with all three statements:
+
+- micro: style every cell of the statement grids three ways. The first
+  builds new Font/Border/Alignment objects per cell, as the writers once
+  did. The second assigns the shared registry objects, which openpyxl still
+  hashes on every assignment. The third uses _StylePool, which resolves
+  each named style once and then copies its ids. The three must give every
+  cell the same style ids.
+- workbook: build_workbook end to end, multi- and single-sheet, with
+  --tables extra HTML tables of 200 rows.
+
+    python benchmarks/excel_style_pool.py
+    python benchmarks/excel_style_pool.py --periods 20 --tables 30
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from copy import copy
+
+# The app's modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.cell import WriteOnlyCell  # noqa: E402
+
+import excel_builder  # noqa: E402
+
+
+def sample_workbook(periods, n_tables, r):
+    """xbrl_data with every statement line over `periods` years, plus tables."""
+    names = [f"FY{2000 + i}" for i in range(periods)]
+    xbrl = {"periods": names}
+    for statement, structure in excel_builder.STATEMENT_STRUCTURES.items():
+        xbrl[statement] = {}
+        for item in structure:
+            for label in item.get("labels", [])[:1] + item.get("fallback", [])[:1]:
+                xbrl[statement][label] = {p: r.randint(-10**6, 10**7) for p in names if r.random() < 0.9}
+    tables = [
+        {
+            "table": {
+                "title": "Segment Results" if t % 3 else f"Table {t}",
+                "headers": [["", "2023", "2022", "Change"]],
+                "rows": [
+                    [f"Line {i}", f"${r.randint(1, 99999):,}", f"({r.randint(1, 999)})", f"{r.random() * 100:.1f}%"]
+                    for i in range(200)
+                ],
+            },
+            "filing_type": "10-K",
+            "filing_date": "2024-01-01",
+        }
+        for t in range(n_tables)
+    ]
+    return xbrl, tables, [{"type": "10-K", "date": "2024-01-01"}]
+
+
+def statement_cell_styles(periods):
+    """Named style of every cell the three statements write, row by row."""
+    styles = []
+    for structure in excel_builder.STATEMENT_STRUCTURES.values():
+        for item in structure:
+            if item["type"] == "data":
+                styles.append(["label"] + ["acct"] * periods)
+            elif item["type"] == "formula":
+                emphasis = "total" if item.get("total", False) else "subtotal"
+                styles.append([f"label_{emphasis}"] + [f"acct_{emphasis}"] * periods)
+            elif item["type"] == "section":
+                styles.append(["section"])
+    return styles
+
+
+def style_per_cell_objects(ws, named, grid):
+    cells = []
+    for row in grid:
+        for name in row:
+            cell = WriteOnlyCell(ws)
+            for attr, value in named[name].items():
+                setattr(cell, attr, value if isinstance(value, str) else copy(value))
+            cells.append(cell)
+    return cells
+
+
+def style_shared_objects(ws, named, grid):
+    cells = []
+    for row in grid:
+        for name in row:
+            cell = WriteOnlyCell(ws)
+            for attr, value in named[name].items():
+                setattr(cell, attr, value)
+            cells.append(cell)
+    return cells
+
+
+def style_pool(ws, pool, grid):
+    cells = []
+    for row in grid:
+        for name in row:
+            cell = WriteOnlyCell(ws)
+            pool.apply(ws, cell, name)
+            cells.append(cell)
+    return cells
+
+
+def median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--periods", type=int, default=50)
+    parser.add_argument("--tables", type=int, default=0, help="extra 200-row HTML tables in the workbook")
+    parser.add_argument("--runs", type=int, default=7, help="runs per measurement; the median is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    styles = excel_builder._make_styles("#" + excel_builder.DEFAULT_PRIMARY, "#" + excel_builder.DEFAULT_ACCENT)
+    named = styles["cells"]
+    grid = statement_cell_styles(args.periods)
+    print(f"micro: {sum(map(len, grid))} statement cells, {args.periods} periods")
+
+    def run(strategy):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        target = excel_builder._StylePool(wb, styles) if strategy is style_pool else named
+        return [cell._style for cell in strategy(ws, target, grid)]
+
+    reference = run(style_per_cell_objects)
+    for strategy in (style_per_cell_objects, style_shared_objects, style_pool):
+        same = run(strategy) == reference
+        print(f"  {strategy.__name__:24s} {median_ms(lambda: run(strategy), args.runs):6.0f} ms   same styles {same}")
+
+    xbrl, tables, filings = sample_workbook(args.periods, args.tables, random.Random(args.seed))
+    print(f"workbook: 3 statements, {args.periods} periods, {args.tables} tables")
+    for single_sheet in (False, True):
+        ms = median_ms(lambda: excel_builder.build_workbook("Co", "CO", xbrl, tables, filings, single_sheet=single_sheet), args.runs)
+        print(f"  {'single-sheet' if single_sheet else 'multi-sheet':24s} {ms:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
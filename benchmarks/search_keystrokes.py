@@ -0,0 +1,125 @@
+"""Per-keystroke latency of company search: linear scan vs CompanyIndex.
+
+Replays a trace of every prefix of typed queries, as the search box sends
+them, against the old linear filter and against CompanyIndex, and reports
+the median, p99 and worst latency of each. Also checks the two agree on
+every query of the trace.
+
+    python benchmarks/search_keystrokes.py
+    python benchmarks/search_keystrokes.py --tickers $SEC_CACHE_DIR/company_tickers.json
+
+By default it runs on a synthetic list the size of SEC's (about 10,000
+companies); --tickers takes the snapshot sec_client keeps of the real one.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+# The app's modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import company_search  # noqa: E402
+
+WORDS = (
+    "apple micro soft berkshire hathaway alpha beta capital global holdings energy pharma bio therapeutics "
+    "bank financial trust realty semiconductor systems networks american first national united tesla motors "
+    "amazon meta platforms nvidia corp inc ltd group acquisition partners resources gold mining oil gas "
+    "technologies software health care medical devices insurance services"
+).split()
+SUFFIXES = ["Inc.", "Corp", "Corporation", "Ltd", "Holdings, Inc.", "Co", "Group Inc", "LP", "Trust", "PLC"]
+TYPED = ["Apple", "aapl", "micro", "berkshire hath", "BRK-B", "nvda", "tesla mot", "bank of", "energy", " inc", "zzqx", "a", "t"]
+
+
+def linear_search(companies, query, limit=15):
+    """The per-keystroke scan search_company used before CompanyIndex."""
+    query_lower = query.lower().strip()
+    if not query_lower:
+        return []
+
+    exact_ticker = []
+    starts_with = []
+    contains = []
+
+    for co in companies:
+        ticker_lower = co["ticker"].lower()
+        name_lower = co["name"].lower()
+
+        if ticker_lower == query_lower:
+            exact_ticker.append(co)
+        elif ticker_lower.startswith(query_lower) or name_lower.startswith(query_lower):
+            starts_with.append(co)
+        elif query_lower in ticker_lower or query_lower in name_lower:
+            contains.append(co)
+
+    results = exact_ticker + starts_with + contains
+    return results[:limit]
+
+
+def synthetic_companies(count, r):
+    companies = []
+    for i in range(count):
+        name = " ".join(w.title() for w in r.sample(WORDS, r.randint(1, 3))) + " " + r.choice(SUFFIXES)
+        ticker = "".join(r.choice(string.ascii_uppercase) for _ in range(r.randint(1, 5)))
+        if r.random() < 0.03:
+            ticker += "-" + r.choice("ABWU")
+        companies.append({"cik": str(i), "ticker": ticker, "name": name})
+    companies[10] = {"cik": "320193", "ticker": "AAPL", "name": "Apple Inc."}
+    return companies
+
+
+def keystroke_trace(r, extra=300):
+    """Every prefix of TYPED plus `extra` random words and strings."""
+    typed = list(TYPED)
+    for _ in range(extra):
+        if r.random() < 0.5:
+            typed.append(r.choice(WORDS))
+        else:
+            typed.append("".join(r.choice(string.ascii_lowercase + " .-") for _ in range(r.randint(1, 6))))
+    return [q[:end] for q in typed for end in range(1, len(q) + 1)]
+
+
+def time_queries(search, trace):
+    times = []
+    for query in trace:
+        start = time.perf_counter()
+        search(query)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)], times[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tickers", help="ticker snapshot written by sec_client (company_tickers.json)")
+    parser.add_argument("--companies", type=int, default=10000, help="size of the synthetic list")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    r = random.Random(args.seed)
+    if args.tickers:
+        with open(args.tickers) as f:
+            companies = json.load(f)["tickers"]
+    else:
+        companies = synthetic_companies(args.companies, r)
+    trace = keystroke_trace(r)
+
+    start = time.perf_counter()
+    index = company_search.CompanyIndex(companies)
+    print(f"{len(companies)} companies, index built in {time.perf_counter() - start:.2f} s")
+
+    mismatches = [q for q in trace if index.search(q) != linear_search(companies, q)]
+    print(f"{len(trace)} queries, {len(mismatches)} mismatches", *mismatches[:5])
+
+    for name, search in (("linear", lambda q: linear_search(companies, q)), ("index", index.search)):
+        median, p99, worst = time_queries(search, trace)
+        print(f"{name:>6}: median {median * 1e6:7.0f} us   p99 {p99 * 1e6:7.0f} us   max {worst * 1e6:7.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Statement extraction from companyfacts: linear period matching vs the index.
+
+extract_financials used to scan every fact of every statement concept for
+each selected filing, parsing both dates at each comparison. It now looks
+facts up in build_fact_index's per-concept, per-form sorted end dates.
+This times both on large-filer-sized synthetic payloads and checks they
+pick the same facts.
+
+    python benchmarks/xbrl_period_index.py
+    python benchmarks/xbrl_period_index.py --facts companyfacts.json
+
+--facts takes a real companyfacts payload (e.g. saved from
+data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json) instead.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# The app's modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xbrl_parser  # noqa: E402
+
+FORMS = ["10-K", "10-Q", "10-K/A", "8-K", "10-Q/A", "S-1"]
+
+
+def _match_filing_period(fact, filing_date, filing_type):
+    """The per-comparison check extract_financials made before the index."""
+    fact_form = fact.get("form", "")
+    fact_end = fact.get("end", "")
+    if filing_type.startswith("10-K") and fact_form in ("10-K", "10-K/A"):
+        max_days = 120
+    elif filing_type.startswith("10-Q") and fact_form in ("10-Q", "10-Q/A"):
+        max_days = 90
+    else:
+        return False
+    if not fact_end:
+        return False
+    end_dt = xbrl_parser._parse_xbrl_date(fact_end)
+    filing_dt = xbrl_parser._parse_xbrl_date(filing_date)
+    return bool(end_dt and filing_dt and 0 <= (filing_dt - end_dt).days <= max_days)
+
+
+def linear_extract_financials(xbrl_facts, selected_filings):
+    """extract_financials as it was: concepts x filings x facts."""
+    tax_data = xbrl_facts.get("facts", {}).get("us-gaap", {})
+    result = {}
+    all_periods = set()
+    for statement_name, concepts in xbrl_parser.STATEMENTS.items():
+        statement_data = {}
+        seen_labels = set()
+        for concept_name, label in concepts:
+            if label in seen_labels:
+                continue
+            facts = [entry for entries in tax_data.get(concept_name, {}).get("units", {}).values() for entry in entries]
+            if not facts:
+                continue
+            period_values = {}
+            for filing in selected_filings:
+                for fact in facts:
+                    if _match_filing_period(fact, filing["date"], filing["type"]) and fact.get("val") is not None:
+                        period_key = fact.get("end", filing["date"])
+                        period_values[period_key] = fact["val"]
+                        all_periods.add(period_key)
+                        break
+            if period_values:
+                statement_data[label] = period_values
+                seen_labels.add(label)
+        result[statement_name] = statement_data
+    result["periods"] = sorted(all_periods)
+    return result
+
+
+def synthetic_facts(r, facts_per_concept=1500, other_concepts=300):
+    """A companyfacts payload with every statement concept and many others."""
+    concepts = xbrl_parser.statement_concepts() + ["Other%d" % i for i in range(other_concepts)]
+    gaap = {}
+    for concept in concepts:
+        if r.random() < 0.15:
+            continue
+        units = {}
+        for unit in ("USD", "shares"):
+            entries = []
+            for _ in range(facts_per_concept // 2):
+                year = r.randint(1995, 2024)
+                end = "%04d-%02d-%02d" % (year, r.randint(1, 12), r.randint(1, 28))
+                entries.append({
+                    "end": end if r.random() > 0.01 else "bad",
+                    "val": r.choice([None, r.randint(-9**9, 9**9), 1.5]),
+                    "form": r.choice(FORMS),
+                    "filed": end,
+                    "fy": year,
+                    "fp": "FY",
+                })
+            units[unit] = entries
+        gaap[concept] = {"label": concept, "units": units}
+    return {"facts": {"us-gaap": gaap}}
+
+
+def selected_filings(r, count=12):
+    """count filings a user might tick: yearly 10-Ks and quarterly 10-Qs."""
+    filings = [
+        {"type": form, "date": "20%02d-%02d-15" % (year, month)}
+        for year in range(14, 25)
+        for form, month in (("10-K", 2), ("10-Q", 5), ("10-Q", 8), ("10-Q/A", 11), ("8-K", 3))
+    ]
+    start = r.randrange(len(filings) - count)
+    return filings[start:start + count]
+
+
+def median_of(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return out, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--facts", help="companyfacts JSON file to use instead of synthetic payloads")
+    parser.add_argument("--payloads", type=int, default=3, help="synthetic payloads to run")
+    parser.add_argument("--filings", type=int, default=12, help="filings selected per run")
+    parser.add_argument("--runs", type=int, default=3, help="runs per payload; the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    r = random.Random(args.seed)
+    if args.facts:
+        with open(args.facts) as f:
+            payloads = [json.load(f)]
+    else:
+        payloads = [synthetic_facts(r) for _ in range(args.payloads)]
+
+    for i, facts in enumerate(payloads):
+        filings = selected_filings(r, args.filings)
+        expected, linear = median_of(lambda: linear_extract_financials(facts, filings), args.runs)
+        actual, indexed = median_of(lambda: xbrl_parser.extract_financials(facts, filings), args.runs)
+        print(
+            f"payload {i}: identical {actual == expected}   "
+            f"linear {linear * 1000:7.0f} ms   index {indexed * 1000:6.0f} ms   {linear / indexed:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""In-memory search index over the SEC company ticker list.
+
+Answers the same query as a linear scan over every company - exact ticker
+matches first, then tickers or names starting with the query, then tickers
+or names containing it, each group in ticker-list order - without touching
+every company per keystroke:
+
+- exact tickers come from a dict,
+- starts-with matches from sorted (key, position) arrays and bisect,
+- contains matches from an n-gram index: for queries of up to GRAM_SIZE
+  characters the posting list is the exact answer, for longer queries the
+  rarest n-gram's list is walked in order and verified until enough results
+  are found.
+"""
+
+from array import array
+from bisect import bisect_left
+
+GRAM_SIZE = 3
+_PREFIX_END = "\U0010ffff"  # sorts after any character a key can continue with
+
+
+def _grams(text, max_n=GRAM_SIZE):
+    """Every substring of text up to max_n characters long."""
+    grams = set()
+    for n in range(1, max_n + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+class CompanyIndex:
+    """Search index over a list of {"cik", "ticker", "name"} dicts."""
+
+    def __init__(self, companies):
+        self.companies = companies
+        self._tickers = []
+        self._names = []
+        self._exact = {}
+        postings = {}
+
+        for position, company in enumerate(companies):
+            ticker = company["ticker"].lower()
+            name = company["name"].lower()
+            self._tickers.append(ticker)
+            self._names.append(name)
+            self._exact.setdefault(ticker, []).append(position)
+            for gram in _grams(ticker) | _grams(name):
+                postings.setdefault(gram, []).append(position)
+
+        # Positions are appended in order, so every posting list is sorted
+        self._postings = {gram: array("i", positions) for gram, positions in postings.items()}
+
+        prefixes = sorted(
+            [(ticker, position) for position, ticker in enumerate(self._tickers)]
+            + [(name, position) for position, name in enumerate(self._names)]
+        )
+        self._prefix_keys = [key for key, _ in prefixes]
+        self._prefix_positions = array("i", [position for _, position in prefixes])
+
+    def __len__(self):
+        return len(self.companies)
+
+    def _starts_with(self, query):
+        """Positions whose ticker or name starts with query, in list order."""
+        lo = bisect_left(self._prefix_keys, query)
+        hi = bisect_left(self._prefix_keys, query + _PREFIX_END, lo)
+        return sorted(set(self._prefix_positions[lo:hi]))
+
+    def _contains(self, query, skip, limit):
+        """Up to limit positions containing query, in list order, not in skip."""
+        found = []
+        if len(query) <= GRAM_SIZE:
+            candidates, verify = self._postings.get(query, ()), False
+        else:
+            grams = [query[i:i + GRAM_SIZE] for i in range(len(query) - GRAM_SIZE + 1)]
+            lists = [self._postings.get(gram, ()) for gram in grams]
+            candidates, verify = min(lists, key=len), True
+
+        for position in candidates:
+            if position in skip:
+                continue
+            if verify and query not in self._tickers[position] and query not in self._names[position]:
+                continue
+            found.append(position)
+            if len(found) >= limit:
+                break
+        return found
+
+    def search(self, query, limit=15):
+        """Return up to limit companies matching query, best matches first."""
+        query = query.lower().strip()
+        if not query:
+            return []
+
+        exact = self._exact.get(query, [])
+        results = list(exact[:limit])
+        if len(results) < limit:
+            exact_set = set(exact)
+            starts = [p for p in self._starts_with(query) if p not in exact_set]
+            results.extend(starts[:limit - len(results)])
+            if len(results) < limit:
+                skip = exact_set.union(starts)
+                results.extend(self._contains(query, skip, limit - len(results)))
+        return [self.companies[position] for position in results]
@@ -0,0 +1,170 @@
+"""Disk-backed byte store with LRU eviction, shared by all worker processes.
+
+Each entry is two files named after the SHA-256 of its key: ``<hash>.bin``
+holds the payload and ``<hash>.json`` a small metadata dict. Files are
+written to a temp name and renamed into place, so readers in other
+processes never see a partial entry. Recency is tracked with the payload
+file's mtime, which is bumped on every hit.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class DiskCache:
+    """Byte store under ``directory`` capped at roughly ``max_bytes``."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size = None  # lazily computed, refreshed on eviction
+
+    def _paths(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return base + ".bin", base + ".json"
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_meta(self, key):
+        """Return the metadata dict for key, or None if not cached."""
+        _, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Return (data, meta) for key, or (None, None) on a miss."""
+        data_path, _ = self._paths(key)
+        meta = self.get_meta(key)
+        if meta is None:
+            return None, None
+        try:
+            with open(data_path, "rb") as f:
+                data = f.read()
+            os.utime(data_path)
+        except OSError:
+            return None, None
+        return data, meta
+
+    def open(self, key):
+        """Return (file, meta) to stream key's payload, or (None, None) on a miss."""
+        data_path, _ = self._paths(key)
+        meta = self.get_meta(key)
+        if meta is None:
+            return None, None
+        try:
+            f = open(data_path, "rb")
+            os.utime(data_path)
+        except OSError:
+            return None, None
+        return f, meta
+
+    def put_stream(self, key, chunks, meta=None):
+        """Pass chunks through while writing them to key.
+
+        The entry is only stored once the iterator is fully consumed; if the
+        consumer stops early or the source fails, the partial file is dropped.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            os.replace(tmp_path, data_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._write_atomic(meta_path, json.dumps(meta or {}).encode("utf-8"))
+        self._account(size)
+
+    def put(self, key, data, meta=None):
+        """Store data and its metadata, evicting old entries if over the cap."""
+        os.makedirs(self.directory, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        self._write_atomic(data_path, data)
+        self._write_atomic(meta_path, json.dumps(meta or {}).encode("utf-8"))
+        self._account(len(data))
+
+    def _account(self, size):
+        """Track a newly written entry and evict if the store is over its cap."""
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = self._disk_usage()
+            else:
+                self._approx_size += size
+            over = self._approx_size > self.max_bytes
+        if over:
+            self.evict()
+
+    def put_meta(self, key, meta):
+        """Replace the metadata for an existing entry."""
+        _, meta_path = self._paths(key)
+        if os.path.exists(meta_path):
+            self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def delete(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _entries(self):
+        """List (mtime, size, data_path) for every payload file."""
+        entries = []
+        try:
+            scan = os.scandir(self.directory)
+        except OSError:
+            return entries
+        with scan:
+            for entry in scan:
+                if not entry.name.endswith(".bin"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until under 90% of the cap."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        entries.sort()
+        for _, size, data_path in entries:
+            if total <= target:
+                break
+            for path in (data_path, data_path[:-4] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+        with self._lock:
+            self._approx_size = total
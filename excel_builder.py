@@ -1,14 +1,18 @@
 """Build organized Excel workbooks from extracted SEC filing data."""
 
-import os
+import io
 import re
-import tempfile
+from copy import copy
 from datetime import datetime
+from functools import lru_cache
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
 
+import html_parser
+
 
 # Default colors (overridden by brand_colors)
 DEFAULT_PRIMARY = "4472C4"
@@ -31,6 +35,25 @@ ACCT_FMT = '#,##0_);(#,##0)'
 ACCT_FMT_DEC = '#,##0.00_);(#,##0.00)'
 PCT_FMT = '0.00%'
 
+BOLD_FONT = Font(bold=True)
+RIGHT_ALIGN = Alignment(horizontal="right")
+CENTER_ALIGN = Alignment(horizontal="center")
+INDENT_ALIGN = Alignment(indent=1)
+
+# Number cell styles by kind (see _number_style); "number" is a non-numeric
+# value that is still right-aligned
+NUMBER_FORMATS = {
+    "acct": ACCT_FMT,
+    "acct_dec": ACCT_FMT_DEC,
+    "pct": PCT_FMT,
+    "year": "0",
+    "number": None,
+}
+EMPHASIS_BORDERS = {
+    "subtotal": SUBTOTAL_BORDER,
+    "total": TOTAL_BORDER,
+}
+
 
 # ─── Statement Structures for Formula-Based Output ─────────────────────
 #
@@ -225,11 +248,22 @@ def _hex_to_openpyxl(hex_color):
 
 
 def _make_styles(primary_hex, accent_hex):
-    """Create style objects from brand colors."""
-    primary = _hex_to_openpyxl(primary_hex)
-    accent = _hex_to_openpyxl(accent_hex)
+    """Return the style registry for a brand color pair.
+
+    Built once per (primary, accent) and shared by every workbook using those
+    colors, so treat it as read-only.
+    """
+    return _build_styles(_hex_to_openpyxl(primary_hex), _hex_to_openpyxl(accent_hex))
 
-    return {
+
+@lru_cache(maxsize=64)
+def _build_styles(primary, accent):
+    """Style objects plus named cell styles ("cells") for one color pair.
+
+    Each named cell style maps cell attributes to the objects to assign;
+    _StylePool resolves them once per workbook.
+    """
+    styles = {
         "title_fill": PatternFill(start_color=primary, end_color=primary, fill_type="solid"),
         "title_font": Font(bold=True, size=13, color="FFFFFF"),
         "header_fill": PatternFill(start_color=accent, end_color=accent, fill_type="solid"),
@@ -238,6 +272,29 @@ def _make_styles(primary_hex, accent_hex):
         "subtitle_font": Font(bold=True, size=11, color="555555"),
     }
 
+    cells = {
+        "title": {"font": styles["title_font"], "fill": styles["title_fill"]},
+        "title_fill": {"fill": styles["title_fill"]},
+        "header": {"font": styles["header_font"], "fill": styles["header_fill"]},
+        "header_center": {"font": styles["header_font"], "fill": styles["header_fill"],
+                          "alignment": CENTER_ALIGN},
+        "section": {"font": styles["subtitle_font"]},
+        "label": {"border": THIN_BORDER, "alignment": INDENT_ALIGN},
+        "text_border": {"border": THIN_BORDER},
+    }
+    for emphasis, border in EMPHASIS_BORDERS.items():
+        cells[f"label_{emphasis}"] = {"font": BOLD_FONT, "border": border}
+    for kind, number_format in NUMBER_FORMATS.items():
+        number = {"alignment": RIGHT_ALIGN}
+        if number_format:
+            number["number_format"] = number_format
+        cells[kind] = number
+        for emphasis, border in EMPHASIS_BORDERS.items():
+            cells[f"{kind}_{emphasis}"] = dict(number, font=BOLD_FONT, border=border)
+
+    styles["cells"] = cells
+    return styles
+
 
 def _safe_sheet_name(name, max_len=31):
     """Make a string safe for use as an Excel sheet name."""
@@ -271,66 +328,123 @@ def _is_year_like(val):
     return False
 
 
-def _try_parse_number(text):
-    """Try to convert text to a number for Excel."""
-    if not text or text in ("\u2014", "\u2013", "-", ""):
-        return None, False
-
-    cleaned = text.replace("$", "").replace(",", "").replace(" ", "").strip()
-
-    # Handle parentheses as negatives: (123) -> -123
-    if cleaned.startswith("(") and cleaned.endswith(")"):
-        cleaned = "-" + cleaned[1:-1]
-
-    is_pct = cleaned.endswith("%")
+def _number_style(val, is_pct=False):
+    """Name of the number cell style for a value (a key of NUMBER_FORMATS)."""
     if is_pct:
-        cleaned = cleaned[:-1]
+        return "pct"
+    if _is_year_like(val):
+        return "year"
+    if isinstance(val, float):
+        return "acct_dec"
+    if isinstance(val, int):
+        return "acct"
+    return "number"
 
-    try:
-        val = float(cleaned)
-        if is_pct:
-            val = val / 100.0
-            return val, True
-        if val == int(val):
-            return int(val), False
-        return val, False
-    except (ValueError, OverflowError):
-        return None, False
 
+def _format_number_cell(ws, row, column, val, is_pct=False, emphasis=None):
+    """Write a number cell with accounting formatting.
 
-def _format_number_cell(cell, val, is_pct=False):
-    """Apply accounting formatting to a number cell."""
-    cell.value = val
-    cell.alignment = Alignment(horizontal="right")
+    emphasis is "subtotal" or "total" for bold figures with a rule above.
+    """
+    style = _number_style(val, is_pct)
+    if emphasis:
+        style = f"{style}_{emphasis}"
+    return ws.cell(row=row, column=column, value=val, style=style)
 
-    if is_pct:
-        cell.number_format = PCT_FMT
-    elif _is_year_like(val):
-        cell.number_format = '0'
-    elif isinstance(val, float):
-        cell.number_format = ACCT_FMT_DEC
-    elif isinstance(val, int):
-        cell.number_format = ACCT_FMT
-
-
-def _auto_width(ws, min_width=12, max_width=45):
-    """Auto-fit column widths based on content."""
-    for col_cells in ws.columns:
-        max_length = min_width
-        col_letter = get_column_letter(col_cells[0].column)
-        for cell in col_cells:
-            if cell.value:
-                length = len(str(cell.value)) + 3
-                max_length = max(max_length, min(length, max_width))
-        ws.column_dimensions[col_letter].width = max_length
+
+# ─── Streaming Sheet Writer ────────────────────────────────────────────
+#
+# Workbooks are built in openpyxl's write-only mode, where rows go straight
+# to the sheet's XML as they are appended and no cell objects are kept once
+# a sheet is done. The writers below address cells as ws.cell(row, column),
+# so each sheet is built in a _SheetBuffer that hands out WriteOnlyCells,
+# then flushed in one pass that also auto-fits column widths (write-only
+# sheets need their widths before the first row goes out).
+#
+# Cell styles are applied by name from the registry built in _make_styles.
+# openpyxl hashes every Font/Fill/Border/Alignment assigned to a cell to find
+# its id in the workbook's style tables; _StylePool does that once per named
+# style and workbook, then stamps the resolved ids onto each further cell.
+
+class _StylePool:
+    """Named cell styles resolved to style ids for one workbook."""
+
+    def __init__(self, wb, styles):
+        self.wb = wb
+        self.named = styles["cells"]
+        self._resolved = {}
+
+    def apply(self, ws, cell, name):
+        style = self._resolved.get(name)
+        if style is None:
+            probe = WriteOnlyCell(ws)
+            for attr, value in self.named[name].items():
+                setattr(probe, attr, value)
+            style = self._resolved[name] = probe._style
+        cell._style = copy(style)
+
+
+class _SheetBuffer:
+    """Collects one sheet's cells by (row, column) until flushed."""
+
+    def __init__(self, ws, pool):
+        self.ws = ws
+        self.pool = pool
+        self._rows = {}
+        self._max_col = 0
+
+    def cell(self, row, column, value=None, style=None):
+        """Return the cell at (row, column), creating it on first use.
+
+        style names a cell style from the registry and replaces any styling
+        the cell already had.
+        """
+        cells = self._rows.setdefault(row, {})
+        cell = cells.get(column)
+        if cell is None:
+            cell = cells[column] = WriteOnlyCell(self.ws)
+            if column > self._max_col:
+                self._max_col = column
+        if value is not None:
+            cell.value = value
+        if style is not None:
+            self.pool.apply(self.ws, cell, style)
+        return cell
+
+    def flush(self, min_width=12, max_width=45):
+        """Auto-fit column widths, then write every row to the sheet in order."""
+        widths = [min_width] * (self._max_col + 1)
+        for cells in self._rows.values():
+            for column, cell in cells.items():
+                if cell.value:
+                    length = min(len(str(cell.value)) + 3, max_width)
+                    if length > widths[column]:
+                        widths[column] = length
+        for column in range(1, self._max_col + 1):
+            self.ws.column_dimensions[get_column_letter(column)].width = widths[column]
+
+        last_row = max(self._rows, default=0)
+        for row in range(1, last_row + 1):
+            cells = self._rows.pop(row, None)
+            if not cells:
+                self.ws.append([])
+                continue
+            self.ws.append([cells.get(column) for column in range(1, max(cells) + 1)])
+
+
+def _new_sheet(pool, title, freeze_panes=None):
+    """Create a write-only sheet in the pool's workbook and return its _SheetBuffer."""
+    ws = pool.wb.create_sheet(title=title)
+    if freeze_panes:
+        ws.freeze_panes = freeze_panes
+    return _SheetBuffer(ws, pool)
 
 
 def _write_title_bar(ws, row, title, num_cols, styles):
     """Write a colored title bar spanning multiple columns."""
-    ws.cell(row=row, column=1, value=title).font = styles["title_font"]
-    ws.cell(row=row, column=1).fill = styles["title_fill"]
+    ws.cell(row=row, column=1, value=title, style="title")
     for col in range(2, num_cols + 1):
-        ws.cell(row=row, column=col).fill = styles["title_fill"]
+        ws.cell(row=row, column=col, style="title_fill")
 
 
 def _find_data_for_item(statement_data, labels):
@@ -386,13 +500,9 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
     row += 1
 
     # Period headers
-    ws.cell(row=row, column=1, value="Line Item").font = styles["header_font"]
-    ws.cell(row=row, column=1).fill = styles["header_fill"]
+    ws.cell(row=row, column=1, value="Line Item", style="header")
     for i, period in enumerate(periods):
-        cell = ws.cell(row=row, column=i + 2, value=period)
-        cell.font = styles["header_font"]
-        cell.fill = styles["header_fill"]
-        cell.alignment = Alignment(horizontal="center")
+        ws.cell(row=row, column=i + 2, value=period, style="header_center")
     row += 1
 
     # Track which Excel row each item ID is written to
@@ -408,9 +518,7 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
 
         # ── Section header ──
         if item_type == "section":
-            ws.cell(row=row, column=1, value=item["label"]).font = Font(
-                bold=True, size=11, color="555555"
-            )
+            ws.cell(row=row, column=1, value=item["label"], style="section")
             row += 1
             continue
 
@@ -427,9 +535,7 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
             negate = item.get("negate", False)
             display_label = matched_label or item.get("labels", [""])[0]
 
-            c = ws.cell(row=row, column=1, value=display_label)
-            c.border = THIN_BORDER
-            c.alignment = Alignment(indent=1)
+            ws.cell(row=row, column=1, value=display_label, style="label")
 
             has_any_value = False
             for i, period in enumerate(periods):
@@ -438,7 +544,7 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
                     if isinstance(val, (int, float)):
                         if negate:
                             val = -val
-                        _format_number_cell(ws.cell(row=row, column=i + 2), val)
+                        _format_number_cell(ws, row, i + 2, val)
                         has_any_value = True
 
             if has_any_value:
@@ -451,25 +557,17 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
             minus_rows = [row_map[ref] for ref in item.get("minus", []) if ref in row_map]
             has_formula = bool(plus_rows or minus_rows)
 
-            is_total = item.get("total", False)
-            border = TOTAL_BORDER if is_total else SUBTOTAL_BORDER
+            emphasis = "total" if item.get("total", False) else "subtotal"
 
             if has_formula:
                 label = item.get("label", "")
-                c = ws.cell(row=row, column=1, value=label)
-                c.font = Font(bold=True)
-                c.border = border
+                ws.cell(row=row, column=1, value=label, style=f"label_{emphasis}")
 
                 for i, period in enumerate(periods):
                     col_letter = get_column_letter(i + 2)
                     formula = _build_formula(col_letter, plus_rows, minus_rows)
                     if formula:
-                        cell = ws.cell(row=row, column=i + 2)
-                        cell.value = formula
-                        cell.number_format = ACCT_FMT
-                        cell.alignment = Alignment(horizontal="right")
-                        cell.font = Font(bold=True)
-                        cell.border = border
+                        ws.cell(row=row, column=i + 2, value=formula, style=f"acct_{emphasis}")
 
                 row_map[item_id] = row
                 row += 1
@@ -480,19 +578,14 @@ def _write_formula_statement(ws, statement_name, statement_data, periods, start_
                 values, matched_label = _find_data_for_item(statement_data, fallback_labels)
                 if values:
                     label = item.get("label", "")
-                    c = ws.cell(row=row, column=1, value=label)
-                    c.font = Font(bold=True)
-                    c.border = border
+                    ws.cell(row=row, column=1, value=label, style=f"label_{emphasis}")
 
                     has_any_value = False
                     for i, period in enumerate(periods):
                         if period in values:
                             val = values[period]
                             if isinstance(val, (int, float)):
-                                cell = ws.cell(row=row, column=i + 2)
-                                _format_number_cell(cell, val)
-                                cell.font = Font(bold=True)
-                                cell.border = border
+                                _format_number_cell(ws, row, i + 2, val, emphasis=emphasis)
                                 has_any_value = True
 
                     if has_any_value:
@@ -525,28 +618,30 @@ def _write_html_table(ws, table_dict, start_row, styles, title_override=None, fi
 
     # Source subtitle if provided
     if filing_source:
-        ws.cell(row=row, column=1, value=f"Source: {filing_source}").font = styles["subtitle_font"]
+        ws.cell(row=row, column=1, value=f"Source: {filing_source}", style="section")
         row += 1
 
     # Headers
     for header_row in headers:
         for col_idx, val in enumerate(header_row):
-            cell = ws.cell(row=row, column=col_idx + 1, value=val)
-            cell.font = styles["header_font"]
-            cell.fill = styles["header_fill"]
-            cell.alignment = Alignment(horizontal="center")
+            ws.cell(row=row, column=col_idx + 1, value=val, style="header_center")
         row += 1
 
-    # Data rows
-    for data_row in data_rows:
+    # Data rows. Cells were parsed once by html_parser; tables stored
+    # without "values" are parsed here instead.
+    values = table_dict.get("values") or [None] * len(data_rows)
+    for data_row, row_values in zip(data_rows, values):
         for col_idx, val in enumerate(data_row):
-            num, is_pct = _try_parse_number(val)
+            if row_values is None:
+                num, is_pct = html_parser.parse_number(val)
+            else:
+                num, is_pct = row_values[col_idx] or (None, False)
             if num is not None:
-                _format_number_cell(ws.cell(row=row, column=col_idx + 1), num, is_pct)
+                _format_number_cell(ws, row, col_idx + 1, num, is_pct)
+            elif col_idx == 0:
+                ws.cell(row=row, column=col_idx + 1, value=val, style="text_border")
             else:
                 ws.cell(row=row, column=col_idx + 1, value=val)
-                if col_idx == 0:
-                    ws.cell(row=row, column=col_idx + 1).border = THIN_BORDER
         row += 1
 
     row += 1
@@ -556,8 +651,8 @@ def _write_html_table(ws, table_dict, start_row, styles, title_override=None, fi
 # ─── Workbook Builders ─────────────────────────────────────────────────
 
 def build_workbook(company_name, ticker, xbrl_data, selected_tables, selected_filings,
-                   single_sheet=False, brand_colors=None):
-    """Build and save an Excel workbook.
+                   single_sheet=False, brand_colors=None, output=None):
+    """Build an Excel workbook and save it to output.
 
     Args:
         company_name: Company display name.
@@ -567,38 +662,39 @@ def build_workbook(company_name, ticker, xbrl_data, selected_tables, selected_fi
         selected_filings: List of filing dicts {type, date, accession, ...}.
         single_sheet: If True, put everything on one sheet instead of separate tabs.
         brand_colors: Optional dict with 'primary' and 'accent' hex colors.
+        output: Path or writable binary file to save to (default: a new BytesIO).
 
     Returns:
-        (filepath, filename) tuple.
+        (output, filename) tuple.
     """
     # Build styles from brand colors
     primary = (brand_colors or {}).get("primary", "#" + DEFAULT_PRIMARY)
     accent = (brand_colors or {}).get("accent", "#" + DEFAULT_ACCENT)
     styles = _make_styles(primary, accent)
 
-    wb = Workbook()
+    wb = Workbook(write_only=True)
+    pool = _StylePool(wb, styles)
     used_sheet_names = set()
     periods = xbrl_data.get("periods", [])
 
     if single_sheet:
-        _build_single_sheet(wb, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, styles)
+        _build_single_sheet(pool, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, styles)
     else:
-        _build_multi_sheet(wb, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, used_sheet_names, styles)
+        _build_multi_sheet(pool, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, used_sheet_names, styles)
 
     # Save
     safe_ticker = re.sub(r'[^A-Za-z0-9]', '', ticker or company_name[:10])
     filename = f"{safe_ticker}_SEC_Filings.xlsx"
-    output_dir = tempfile.mkdtemp()
-    filepath = os.path.join(output_dir, filename)
-    wb.save(filepath)
+    if output is None:
+        output = io.BytesIO()
+    wb.save(output)
 
-    return filepath, filename
+    return output, filename
 
 
-def _build_single_sheet(wb, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, styles):
+def _build_single_sheet(pool, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, styles):
     """Put all data on a single sheet, one section after another."""
-    ws = wb.active
-    ws.title = "All Data"
+    ws = _new_sheet(pool, "All Data", freeze_panes="B1")
 
     row = 1
     ws.cell(row=row, column=1, value=f"{company_name} ({ticker})").font = styles["title_font_plain"]
@@ -622,76 +718,68 @@ def _build_single_sheet(wb, company_name, ticker, xbrl_data, selected_tables, se
         row = _write_html_table(ws, table, start_row=row, styles=styles, filing_source=source)
         row += 1
 
-    ws.freeze_panes = "B1"
-    _auto_width(ws)
+    ws.flush()
 
 
-def _build_multi_sheet(wb, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, used_sheet_names, styles):
+def _build_multi_sheet(pool, company_name, ticker, xbrl_data, selected_tables, selected_filings, periods, used_sheet_names, styles):
     """Separate tabs: Index + core financials + one sheet per selected table."""
 
-    # --- Index Sheet ---
-    ws_index = wb.active
-    ws_index.title = "Index"
+    # Sheets are written in order, so name every sheet up front: the Index
+    # lists the table sheets before any of them exist.
     used_sheet_names.add("Index")
+    statement_sheets = []
+    for statement_name in ("Income Statement", "Balance Sheet", "Cash Flow"):
+        statement_data = xbrl_data.get(statement_name, {})
+        if statement_data:
+            sheet_name = _unique_sheet_name(statement_name, used_sheet_names)
+            statement_sheets.append((sheet_name, statement_name, statement_data))
+
+    table_sheets = []
+    for entry in selected_tables:
+        table = entry["table"]
+        title = table.get("title") or "Table"
+        source = f"{entry.get('filing_type', '')} ({entry.get('filing_date', '')})"
+        table_sheets.append((_unique_sheet_name(title, used_sheet_names), table, source))
+
+    # --- Index Sheet ---
+    ws_index = _new_sheet(pool, "Index")
 
     ws_index.cell(row=1, column=1, value=f"{company_name} ({ticker})").font = styles["title_font_plain"]
     ws_index.cell(row=2, column=1, value=f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}").font = styles["subtitle_font"]
 
     ws_index.cell(row=4, column=1, value="Filings Included:").font = styles["header_font"]
     row = 5
-    ws_index.cell(row=row, column=1, value="Type").font = styles["header_font"]
-    ws_index.cell(row=row, column=1).fill = styles["header_fill"]
-    ws_index.cell(row=row, column=2, value="Date").font = styles["header_font"]
-    ws_index.cell(row=row, column=2).fill = styles["header_fill"]
+    ws_index.cell(row=row, column=1, value="Type", style="header")
+    ws_index.cell(row=row, column=2, value="Date", style="header")
     row += 1
     for filing in selected_filings:
         ws_index.cell(row=row, column=1, value=filing.get("type", ""))
         ws_index.cell(row=row, column=2, value=filing.get("date", ""))
         row += 1
 
-    if selected_tables:
+    if table_sheets:
         row += 1
         ws_index.cell(row=row, column=1, value="Additional Tables Included:").font = styles["header_font"]
         row += 1
-        ws_index.cell(row=row, column=1, value="Sheet Name").font = styles["header_font"]
-        ws_index.cell(row=row, column=1).fill = styles["header_fill"]
-        ws_index.cell(row=row, column=2, value="Source").font = styles["header_font"]
-        ws_index.cell(row=row, column=2).fill = styles["header_fill"]
+        ws_index.cell(row=row, column=1, value="Sheet Name", style="header")
+        ws_index.cell(row=row, column=2, value="Source", style="header")
         row += 1
 
-    _auto_width(ws_index)
+    for sheet_name, _, source in table_sheets:
+        ws_index.cell(row=row, column=1, value=sheet_name)
+        ws_index.cell(row=row, column=2, value=source)
+        row += 1
 
-    # --- Core Financial Statement Sheets (with formulas) ---
-    for statement_name in ("Income Statement", "Balance Sheet", "Cash Flow"):
-        statement_data = xbrl_data.get(statement_name, {})
-        if not statement_data:
-            continue
+    ws_index.flush()
 
-        sheet_name = _unique_sheet_name(statement_name, used_sheet_names)
-        ws = wb.create_sheet(title=sheet_name)
-        ws.freeze_panes = "B3"
+    # --- Core Financial Statement Sheets (with formulas) ---
+    for sheet_name, statement_name, statement_data in statement_sheets:
+        ws = _new_sheet(pool, sheet_name, freeze_panes="B3")
         _write_formula_statement(ws, statement_name, statement_data, periods, start_row=1, styles=styles)
-        _auto_width(ws)
+        ws.flush()
 
     # --- Individual Table Sheets ---
-    index_table_row = row
-    for entry in selected_tables:
-        table = entry["table"]
-        filing_type = entry.get("filing_type", "")
-        filing_date = entry.get("filing_date", "")
-        title = table.get("title") or "Table"
-        source = f"{filing_type} ({filing_date})"
-
-        sheet_name = _unique_sheet_name(title, used_sheet_names)
-        ws = wb.create_sheet(title=sheet_name)
-        ws.freeze_panes = "A3"
-
+    for sheet_name, table, source in table_sheets:
+        ws = _new_sheet(pool, sheet_name, freeze_panes="A3")
         _write_html_table(ws, table, start_row=1, styles=styles, filing_source=source)
-        _auto_width(ws)
-
-        # Add to index
-        ws_index.cell(row=index_table_row, column=1, value=sheet_name)
-        ws_index.cell(row=index_table_row, column=2, value=source)
-        index_table_row += 1
-
-    _auto_width(ws_index)
+        ws.flush()
@@ -1,21 +1,36 @@
-"""Parse SEC filing HTML documents to extract all numerical tables."""
+"""Parse SEC filing HTML documents to extract all numerical tables.
+
+Two extraction engines produce identical output: "lxml" walks an lxml.etree
+tree directly and is the default; "bs4" is the original BeautifulSoup
+implementation, kept as the reference.
+"""
 
 import re
 from bs4 import BeautifulSoup, NavigableString
+from lxml import etree
+
+# Bump whenever a change alters what is extracted from a document (tables, or
+# the inline XBRL facts gathered alongside them); stored parses from any
+# other version are ignored (see app._table_store).
+PARSER_VERSION = 3
+
+
+_SPECIAL_WHITESPACE = re.compile(r"[\xa0\u200b\t\n\r]+")
+_NUMBER_DECORATION = re.compile(r"[$,%\s\(\)]")
 
 
 def _clean_text(text):
     """Clean cell text: normalize whitespace, strip special chars."""
     if not text:
         return ""
-    text = re.sub(r"[\xa0\u200b\t\n\r]+", " ", text)
+    text = _SPECIAL_WHITESPACE.sub(" ", text)
     text = text.strip()
     return text
 
 
 def _is_numeric(text):
     """Check if text represents a number (including currency, percentages, negatives)."""
-    cleaned = re.sub(r"[$,%\s\(\)]", "", text).replace(",", "").replace("—", "").replace("–", "")
+    cleaned = _NUMBER_DECORATION.sub("", text).replace(",", "").replace("—", "").replace("–", "")
     if not cleaned or cleaned == "-":
         return True
     try:
@@ -25,20 +40,60 @@ def _is_numeric(text):
         return False
 
 
-def _has_enough_numbers(rows, threshold=0.25):
-    """Check if a table has enough numeric content to be a financial table."""
+def parse_number(text):
+    """Parse cell text as a number for Excel.
+
+    Returns (value, is_pct): "(1,234)" gives (-1234, False), "12.5%" gives
+    (0.125, True), and text that is not a number gives (None, False).
+    """
+    if not text or text in ("\u2014", "\u2013", "-", ""):
+        return None, False
+
+    cleaned = text.replace("$", "").replace(",", "").replace(" ", "").strip()
+
+    # Handle parentheses as negatives: (123) -> -123
+    if cleaned.startswith("(") and cleaned.endswith(")"):
+        cleaned = "-" + cleaned[1:-1]
+
+    is_pct = cleaned.endswith("%")
+    if is_pct:
+        cleaned = cleaned[:-1]
+
+    try:
+        val = float(cleaned)
+        if is_pct:
+            val = val / 100.0
+            return val, True
+        if val == int(val):
+            return int(val), False
+        return val, False
+    except (ValueError, OverflowError):
+        return None, False
+
+
+def _cell_value(text):
+    """[value, is_pct] for a cell holding a number, None for any other cell."""
+    value, is_pct = parse_number(text)
+    return None if value is None else [value, is_pct]
+
+
+def _has_enough_numbers(rows, values, threshold=0.25):
+    """Check if a table has enough numeric content to be a financial table.
+
+    values is the table's parsed cells (see _build_rows); only cells that
+    did not parse as a number need the looser _is_numeric test.
+    """
     if not rows:
         return False
 
     total_cells = 0
     numeric_cells = 0
 
-    for row in rows:
-        for cell in row:
-            text = _clean_text(cell)
+    for row, row_values in zip(rows, values):
+        for text, value in zip(row, row_values):
             if text:
                 total_cells += 1
-                if _is_numeric(text):
+                if value is not None or _is_numeric(text):
                     numeric_cells += 1
 
     if total_cells == 0:
@@ -86,36 +141,91 @@ _CONTENT_PATTERNS = [
 ]
 
 
+def _keyword_prefixes(keywords):
+    """Map each keyword to the keywords it starts with, itself included."""
+    return {kw: [other for other in keywords if kw.startswith(other)] for kw in keywords}
+
+
+def _keyword_regex(keywords):
+    """Regex source matching any keyword, built as a trie.
+
+    Alternatives at each level start with different characters, so a
+    position that starts no keyword fails on its first character, and
+    continuations are greedy, so the longest keyword at a position wins.
+    """
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for char in kw:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+        if "" in node:
+            body = "(?:%s)?" % body
+        return body
+
+    return build(trie)
+
+
+def _keyword_pattern_index(patterns):
+    """Map each keyword to the indices of the patterns listing it."""
+    index = {}
+    for i, (keywords, _) in enumerate(patterns):
+        for kw in keywords:
+            index.setdefault(kw, []).append(i)
+    return index
+
+
+# Every content keyword in one lookahead pattern: it matches at each
+# position where some keyword starts, capturing the longest one. Any shorter
+# keyword starting there is a prefix of it, so the prefix map recovers the
+# full set of keywords present in a single pass over the text.
+_CONTENT_KEYWORDS = sorted({kw for keywords, _ in _CONTENT_PATTERNS for kw in keywords})
+_CONTENT_MATCHER = re.compile("(?=(%s))" % _keyword_regex(_CONTENT_KEYWORDS))
+_CONTENT_PREFIXES = _keyword_prefixes(_CONTENT_KEYWORDS)
+_CONTENT_PATTERN_INDEX = _keyword_pattern_index(_CONTENT_PATTERNS)
+
+
+def _content_keywords(text):
+    """Return the set of content keywords occurring anywhere in text."""
+    found = set()
+    for kw in set(_CONTENT_MATCHER.findall(text)):
+        found.update(_CONTENT_PREFIXES[kw])
+    return found
+
+
 def _infer_title_from_content(headers, rows):
     """Analyze header and row label text to infer what a table is about."""
     # Gather all text from headers and first column of rows
     text_pool = []
     for header_row in headers:
         for cell in header_row:
-            text_pool.append(_clean_text(cell).lower())
+            text_pool.append(cell.lower())
     for row in rows:
         if row:
-            text_pool.append(_clean_text(row[0]).lower())
-
-    combined = " ".join(text_pool)
+            text_pool.append(row[0].lower())
 
-    # Try each pattern
-    best_match = None
-    best_count = 0
-    for keywords, title in _CONTENT_PATTERNS:
-        count = sum(1 for kw in keywords if kw in combined)
-        if count > best_count:
-            best_count = count
-            best_match = title
+    # Score each pattern by how many of its keywords occur; the first
+    # pattern with the highest score wins
+    counts = [0] * len(_CONTENT_PATTERNS)
+    for kw in _content_keywords(" ".join(text_pool)):
+        for index in _CONTENT_PATTERN_INDEX[kw]:
+            counts[index] += 1
 
-    if best_match and best_count >= 1:
-        return best_match
+    best_count = max(counts)
+    if best_count >= 1:
+        return _CONTENT_PATTERNS[counts.index(best_count)][1]
 
     # Fallback: use the most common non-numeric text from the first column
     first_col_labels = []
     for row in rows[:10]:
         if row:
-            label = _clean_text(row[0])
+            label = row[0]
             if label and not _is_numeric(label) and len(label) > 2:
                 first_col_labels.append(label)
 
@@ -128,6 +238,39 @@ def _infer_title_from_content(headers, rows):
     return None
 
 
+_TITLE_KEYWORDS = [
+    "statement", "balance", "income", "cash flow", "operations",
+    "financial", "schedule", "table", "equity", "debt",
+    "assets", "liabilities", "revenue", "expenses", "shares",
+    "stock", "compensation", "lease", "segment", "quarter",
+    "annual", "fiscal", "consolidated", "unaudited",
+    "warrant", "option", "restricted", "goodwill", "intangible",
+    "depreciation", "amortization", "tax", "provision",
+    "comprehensive", "accumulated", "capital", "investment",
+]
+_TITLE_MATCHER = re.compile(_keyword_regex(_TITLE_KEYWORDS))
+
+
+def _title_from_sibling_text(tag_name, text):
+    """Return text if a preceding element with this tag looks like a table title."""
+    text = _clean_text(text)
+    if text and len(text) > 3 and len(text) < 200:
+        if tag_name in ("b", "strong", "h1", "h2", "h3", "h4", "h5", "h6", "p", "div", "span"):
+            lower = text.lower()
+            if _TITLE_MATCHER.search(lower) or tag_name in ("b", "strong", "h1", "h2", "h3", "h4"):
+                return text
+    return None
+
+
+def _title_from_first_row(cell_texts):
+    """Return the text of a single spanning cell in the first row, if any."""
+    if len(cell_texts) == 1:
+        text = _clean_text(cell_texts[0])
+        if text and len(text) > 3 and not _is_numeric(text):
+            return text
+    return None
+
+
 def _detect_table_title(table_element, headers, rows):
     """Try to detect a title for the table from surrounding HTML, then from content."""
     # 1. Look at preceding siblings in HTML
@@ -142,31 +285,16 @@ def _detect_table_title(table_element, headers, rows):
         if tag_name in ("table", "hr"):
             break
 
-        text = _clean_text(sibling.get_text())
-        if text and len(text) > 3 and len(text) < 200:
-            if tag_name in ("b", "strong", "h1", "h2", "h3", "h4", "h5", "h6", "p", "div", "span"):
-                lower = text.lower()
-                title_keywords = [
-                    "statement", "balance", "income", "cash flow", "operations",
-                    "financial", "schedule", "table", "equity", "debt",
-                    "assets", "liabilities", "revenue", "expenses", "shares",
-                    "stock", "compensation", "lease", "segment", "quarter",
-                    "annual", "fiscal", "consolidated", "unaudited",
-                    "warrant", "option", "restricted", "goodwill", "intangible",
-                    "depreciation", "amortization", "tax", "provision",
-                    "comprehensive", "accumulated", "capital", "investment",
-                ]
-                if any(kw in lower for kw in title_keywords) or tag_name in ("b", "strong", "h1", "h2", "h3", "h4"):
-                    return text
+        title = _title_from_sibling_text(tag_name, sibling.get_text())
+        if title:
+            return title
 
     # 2. Check the first row for a spanning title cell
     first_row = table_element.find("tr")
     if first_row:
-        cells = first_row.find_all(["td", "th"])
-        if len(cells) == 1:
-            text = _clean_text(cells[0].get_text())
-            if text and len(text) > 3 and not _is_numeric(text):
-                return text
+        title = _title_from_first_row([c.get_text() for c in first_row.find_all(["td", "th"])])
+        if title:
+            return title
 
     # 3. Infer from table content
     return _infer_title_from_content(headers, rows)
@@ -182,21 +310,23 @@ def _prev_siblings(element, limit=5):
         count += 1
 
 
-def _parse_table(table_element):
-    """Parse an HTML table element into headers and rows."""
+def _build_rows(tr_cells):
+    """Turn raw cells into headers, rows and parsed values.
+
+    tr_cells yields one list per <tr> of (tag_name, colspan, text) tuples.
+    Cell text is cleaned once here. values parallels rows: each cell is
+    [value, is_pct] if it holds a number (see parse_number), else None.
+    """
     rows = []
     header_rows = []
 
-    for tr in table_element.find_all("tr"):
-        cells = tr.find_all(["td", "th"])
+    for cells in tr_cells:
         row_data = []
-        is_header = all(cell.name == "th" for cell in cells) if cells else False
+        is_header = all(name == "th" for name, _, _ in cells) if cells else False
 
-        for cell in cells:
-            colspan = int(cell.get("colspan", 1))
-            text = _clean_text(cell.get_text())
-            row_data.append(text)
-            for _ in range(colspan - 1):
+        for _, colspan, text in cells:
+            row_data.append(_clean_text(text))
+            for _ in range(int(colspan) - 1):
                 row_data.append("")
 
         if not any(row_data):
@@ -207,68 +337,322 @@ def _parse_table(table_element):
         else:
             rows.append(row_data)
 
+    values = [[_cell_value(c) for c in row] for row in rows]
+
     headers = []
     if header_rows:
         headers = header_rows
     elif rows:
         first_row = rows[0]
-        non_numeric_count = sum(1 for c in first_row if c and not _is_numeric(c))
+        non_numeric_count = sum(
+            1 for c, v in zip(first_row, values[0]) if c and v is None and not _is_numeric(c)
+        )
         if non_numeric_count > len(first_row) * 0.5:
             headers = [rows.pop(0)]
+            values.pop(0)
 
-    return headers, rows
+    return headers, rows, values
 
 
-def _tables_are_similar(t1, t2):
-    """Check if two table dicts are likely duplicates."""
-    if t1.get("title") and t2.get("title") and t1["title"] == t2["title"]:
-        if len(t1["rows"]) == len(t2["rows"]):
-            return True
+def _parse_table(table_element):
+    """Parse an HTML table element into headers, rows and values."""
+    return _build_rows(
+        [(cell.name, cell.get("colspan", 1), cell.get_text()) for cell in tr.find_all(["td", "th"])]
+        for tr in table_element.find_all("tr")
+    )
 
-    rows1 = t1["rows"][:3]
-    rows2 = t2["rows"][:3]
-    if rows1 and rows2 and rows1 == rows2:
-        return True
 
-    return False
+# ─── lxml engine ───────────────────────────────────────────────────────
+#
+# Mirrors the bs4 functions above on an lxml.etree tree. Text nodes are not
+# nodes in lxml (they hang off .text/.tail), so _lxml_prev_siblings rebuilds
+# the sibling sequence BeautifulSoup would see. <script>/<style> elements are
+# emptied in place rather than removed so that, as with bs4's decompose(),
+# the text on either side stays two separate siblings.
 
+_SKIPPED_TAGS = ("script", "style")
 
-def extract_tables(html_content):
-    """Extract all numerical tables from SEC filing HTML.
 
-    Returns list of dicts: [{title, headers, rows}, ...]
+def _lxml_text(element):
+    """Concatenated descendant text, like bs4's get_text()."""
+    return "".join(element.itertext())
+
+
+def _lxml_blank_skipped(root):
+    """Empty <script>/<style> elements, keeping their tails."""
+    for element in root.iter(*_SKIPPED_TAGS):
+        tail = element.tail
+        element.clear()
+        element.tail = tail
+
+
+def _lxml_prev_siblings(element, limit=5):
+    """Yield previous siblings as bs4 would: text as str, elements as elements."""
+    count = 0
+    node = element.getprevious()
+    while count < limit:
+        if node is None:
+            parent = element.getparent()
+            if parent is not None and parent.text:
+                yield parent.text
+            return
+
+        if node.tail:
+            yield node.tail
+            count += 1
+            if count >= limit:
+                return
+
+        if not isinstance(node.tag, str):
+            # Comment or processing instruction: a string node in bs4
+            yield node.text or ""
+            count += 1
+        elif node.tag not in _SKIPPED_TAGS:
+            yield node
+            count += 1
+        node = node.getprevious()
+
+
+def _lxml_parse_table(table_element):
+    """Parse an lxml table element into headers, rows and values."""
+    return _build_rows(
+        [(cell.tag, cell.get("colspan", 1), _lxml_text(cell)) for cell in tr.iter("td", "th")]
+        for tr in table_element.iter("tr")
+    )
+
+
+def _lxml_detect_table_title(table_element, headers, rows):
+    """lxml counterpart of _detect_table_title."""
+    for sibling in _lxml_prev_siblings(table_element, limit=5):
+        if isinstance(sibling, str):
+            text = _clean_text(sibling)
+            if text and len(text) > 3 and len(text) < 200:
+                return text
+            continue
+
+        if sibling.tag in ("table", "hr"):
+            break
+
+        title = _title_from_sibling_text(sibling.tag, _lxml_text(sibling))
+        if title:
+            return title
+
+    first_row = next(table_element.iter("tr"), None)
+    if first_row is not None:
+        title = _title_from_first_row([_lxml_text(c) for c in first_row.iter("td", "th")])
+        if title:
+            return title
+
+    return _infer_title_from_content(headers, rows)
+
+
+def parse_document(html_content):
+    """Parse filing HTML (str or bytes) into an lxml root element, or None."""
+    if isinstance(html_content, str):
+        # lxml refuses str input that carries an XML encoding declaration,
+        # which many iXBRL filings start with, so hand it UTF-8 bytes.
+        html_content = html_content.encode("utf-8")
+        parser = etree.HTMLParser(encoding="utf-8", huge_tree=True)
+    else:
+        parser = etree.HTMLParser(huge_tree=True)
+    if not html_content.strip():
+        return None
+    return etree.fromstring(html_content, parser)
+
+
+def _duplicate_keys(table):
+    """Keys under which a table counts as a duplicate of an earlier one.
+
+    Two tables are duplicates if they share a title and row count, or if
+    their first three rows are identical, so a table is a duplicate exactly
+    when one of its keys was already recorded for a kept table.
     """
-    soup = BeautifulSoup(html_content, "lxml")
+    keys = []
+    if table.get("title"):
+        keys.append(("title", table["title"], len(table["rows"])))
+    if table["rows"]:
+        keys.append(("rows", tuple(tuple(row) for row in table["rows"][:3])))
+    return keys
 
-    for element in soup.find_all(["script", "style"]):
-        element.decompose()
 
-    tables = []
+def _iter_unique_tables(table_elements, parse_table, detect_title):
+    """Parse, filter and de-duplicate table elements, yielding table dicts."""
+    seen = set()
 
-    for table_el in soup.find_all("table"):
-        headers, rows = _parse_table(table_el)
+    for table_el in table_elements:
+        headers, rows, values = parse_table(table_el)
 
         if len(rows) < 2:
             continue
 
-        if not _has_enough_numbers(rows):
+        if not _has_enough_numbers(rows, values):
             continue
 
-        title = _detect_table_title(table_el, headers, rows)
+        title = detect_title(table_el, headers, rows)
 
         table_dict = {
             "title": title,
             "headers": headers,
             "rows": rows,
+            "values": values,
         }
 
-        is_dup = False
-        for existing in tables:
-            if _tables_are_similar(existing, table_dict):
-                is_dup = True
-                break
+        keys = _duplicate_keys(table_dict)
+        if any(key in seen for key in keys):
+            continue
+
+        seen.update(keys)
+        yield table_dict
 
-        if not is_dup:
-            tables.append(table_dict)
 
-    return tables
+# ─── Streaming ─────────────────────────────────────────────────────────
+#
+# iter_tables() feeds the document into an lxml pull parser chunk by chunk.
+# Each outermost table is handed to the lxml engine as soon as it closes,
+# then emptied. Outside tables, an element's older siblings are dropped
+# once it closes, keeping only the few that title detection looks back
+# at, so the live tree stays small however large the filing is.
+
+_STREAM_KEEP_SIBLINGS = 10
+_STREAM_KEEP_TEXT = 512
+
+
+def _discard_processed_table(table_el):
+    """Drop a processed table's subtree, leaving a stand-in for title detection.
+
+    Later tables may read this table's text through an enclosing sibling,
+    where it only matters as bulk (titles must be under 200 characters), so
+    a bounded slice of it is kept.
+    """
+    text = _bounded_text(_lxml_text(table_el))
+    tail = table_el.tail
+    table_el.clear()
+    table_el.text = text
+    table_el.tail = tail
+
+
+def _bounded_text(text):
+    """Text cut to at most _STREAM_KEEP_TEXT characters, keeping both ends."""
+    if len(text) > _STREAM_KEEP_TEXT:
+        half = _STREAM_KEEP_TEXT // 2
+        text = text[:half] + text[-half:]
+    return text
+
+
+def _trim_prev_siblings(element):
+    """Remove siblings older than the ones title detection can reach.
+
+    The parent's text still counts towards its own _lxml_text when the
+    parent is later a title candidate, so the removed siblings' text (and
+    tails) is folded into parent.text, bounded like a discarded table's.
+    """
+    node = element
+    for _ in range(_STREAM_KEEP_SIBLINGS):
+        node = node.getprevious()
+        if node is None:
+            return
+    parent = element.getparent()
+    removed = []
+    old = node.getprevious()
+    while old is not None:
+        prev = old.getprevious()
+        if isinstance(old.tag, str):
+            removed.append(_lxml_text(old) + (old.tail or ""))
+        else:
+            removed.append(old.tail or "")  # comment text is not element text
+        parent.remove(old)
+        old = prev
+    removed.reverse()
+    parent.text = _bounded_text((parent.text or "") + "".join(removed))
+
+
+def _iter_streamed_tables(chunks, encoding, facts=None):
+    """Yield outermost table elements (and their nested tables) as they close.
+
+    facts, if given, is handed every element as it closes, before anything
+    is discarded (see iter_tables).
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding, huge_tree=True)
+    table_depth = 0
+
+    def drain():
+        nonlocal table_depth
+        for event, element in parser.read_events():
+            if event == "start":
+                if element.tag == "table":
+                    table_depth += 1
+                continue
+
+            if facts is not None:
+                facts.element_closed(element)
+            if element.tag in _SKIPPED_TAGS:
+                element.clear()
+            elif element.tag == "table":
+                table_depth -= 1
+                if table_depth == 0:
+                    yield from element.iter("table")
+                    _discard_processed_table(element)
+            if table_depth == 0 and element.getparent() is not None:
+                _trim_prev_siblings(element)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        return  # empty document
+    yield from drain()
+
+
+def iter_tables(chunks, encoding=None, facts=None):
+    """Extract tables from filing HTML while it is still arriving.
+
+    Args:
+        chunks: Iterable of bytes, e.g. a streamed HTTP response body.
+        encoding: Declared charset of the bytes, or None to let lxml detect it.
+        facts: Optional ixbrl.FactCollector to gather inline XBRL facts into
+            in the same pass; it is complete once the iterator is exhausted.
+
+    Yields {title, headers, rows, values} dicts in document order as soon as each
+    table closes, with the same filtering and de-duplication as
+    extract_tables().
+    """
+    return _iter_unique_tables(
+        _iter_streamed_tables(chunks, encoding, facts),
+        _lxml_parse_table,
+        _lxml_detect_table_title,
+    )
+
+
+def extract_tables(html_content, engine="lxml", facts=None):
+    """Extract all numerical tables from SEC filing HTML.
+
+    Args:
+        html_content: Filing HTML as str or bytes.
+        engine: "lxml" (default) or "bs4". Both return the same tables; lxml
+            is several times faster and uses far less memory on large filings.
+        facts: Optional ixbrl.FactCollector to gather inline XBRL facts into
+            from the same parsed document (lxml engine only).
+
+    Returns list of dicts: [{title, headers, rows, values}, ...], where
+    values parallels rows with each cell's [value, is_pct] or None.
+    """
+    if engine == "lxml":
+        root = parse_document(html_content)
+        if root is None:
+            return []
+        if facts is not None:
+            facts.collect(root)
+        _lxml_blank_skipped(root)
+        return list(_iter_unique_tables(root.iter("table"), _lxml_parse_table, _lxml_detect_table_title))
+
+    if engine == "bs4":
+        if facts is not None:
+            raise ValueError("Inline XBRL facts need the lxml engine")
+        soup = BeautifulSoup(html_content, "lxml")
+        for element in soup.find_all(["script", "style"]):
+            element.decompose()
+        return list(_iter_unique_tables(soup.find_all("table"), _parse_table, _detect_table_title))
+
+    raise ValueError(f"Unknown extraction engine: {engine}")
@@ -0,0 +1,171 @@
+"""Numeric facts from inline XBRL (iXBRL) filing documents.
+
+10-K and 10-Q primary documents are inline XBRL: every tagged number in the
+HTML is an ix:nonFraction element, pointing at a context (the period) and a
+unit defined in the document's hidden ix:header. FactCollector reads those
+elements while html_parser walks the document, and company_facts() shapes
+them like SEC's companyfacts JSON for that one filing, so
+xbrl_parser.extract_financials reads them unchanged.
+
+lxml's HTML parser keeps the prefix and lowercases names, so elements come
+through as "ix:nonfraction" with a "contextref" attribute. As in
+companyfacts, only facts without dimensions are kept: a context with a
+segment or scenario is a breakdown, not the reported total.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+_NOT_NUMBER = re.compile(r"[^0-9.]")
+
+# Transformation formats (the part after "ixt:"/"ixt-sec:") that need more
+# than dropping grouping characters from "1,234.5"
+_ZERO_FORMATS = {"fixed-zero", "fixedzero", "zerodash"}
+_COMMA_DECIMAL_FORMATS = {"num-comma-decimal", "numcommadecimal", "numdotcomma", "numspacecomma"}
+_WORD_FORMATS = {"numwordsen", "num-word-en"}
+_NUMBER_WORDS = {
+    "no": 0, "none": 0, "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+
+def _local_name(tag):
+    """Tag name without its prefix ("xbrli:context" -> "context"), None for comments."""
+    if not isinstance(tag, str):
+        return None
+    return tag.rpartition(":")[2]
+
+
+def _fact_value(element):
+    """Numeric value of an ix:nonFraction element, or None if it has none."""
+    if element.get("xsi:nil") == "true":
+        return None
+
+    text = "".join(element.itertext()).strip()
+    fmt = (element.get("format") or "").rpartition(":")[2].lower()
+    try:
+        if fmt in _ZERO_FORMATS:
+            number = Decimal(0)
+        elif fmt in _WORD_FORMATS:
+            if text.lower() not in _NUMBER_WORDS:
+                return None
+            number = Decimal(_NUMBER_WORDS[text.lower()])
+        else:
+            if fmt in _COMMA_DECIMAL_FORMATS:
+                text = text.replace(".", "").replace(",", ".")
+            digits = _NOT_NUMBER.sub("", text)
+            if not digits:
+                return None
+            number = Decimal(digits)
+
+        if element.get("scale"):
+            number = number.scaleb(int(element.get("scale")))
+    except (InvalidOperation, ValueError):
+        return None
+
+    if element.get("sign") == "-":
+        number = -number
+    if number == number.to_integral_value():
+        return int(number)
+    return float(number)
+
+
+def _context_period(element):
+    """{"start", "end"} or {"end"} for a context, or None if it has dimensions."""
+    start = end = None
+    for child in element.iter():
+        name = _local_name(child.tag)
+        if name in ("segment", "scenario"):
+            return None
+        if name == "startdate":
+            start = (child.text or "").strip()
+        elif name in ("enddate", "instant"):
+            end = (child.text or "").strip()
+    if not end:
+        return None
+    return {"start": start, "end": end} if start else {"end": end}
+
+
+def _unit_key(element):
+    """companyfacts-style unit name: "USD", "shares", "USD/shares"."""
+    numerator, denominator = [], []
+    for child in element.iter():
+        if _local_name(child.tag) != "measure":
+            continue
+        measure = (child.text or "").strip().rpartition(":")[2]
+        in_denominator = any(
+            _local_name(a.tag) == "unitdenominator" for a in child.iterancestors()
+        )
+        (denominator if in_denominator else numerator).append(measure)
+    key = "*".join(numerator)
+    if denominator:
+        key += "/" + "*".join(denominator)
+    return key
+
+
+class FactCollector:
+    """Accumulates contexts, units and numeric facts from one document.
+
+    Feed it every element once it is complete, either one at a time with
+    element_closed() while streaming or all at once with collect(root).
+    """
+
+    def __init__(self):
+        self._contexts = {}
+        self._units = {}
+        self._facts = []  # (name, context id, unit id, value) in document order
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._facts)
+
+    def element_closed(self, element):
+        name = _local_name(element.tag)
+        if name == "nonfraction":
+            key = (element.get("name"), element.get("contextref"), element.get("unitref"))
+            if key in self._seen or not all(key):
+                return
+            value = _fact_value(element)
+            if value is not None:
+                self._seen.add(key)
+                self._facts.append(key + (value,))
+        elif name == "context":
+            self._contexts[element.get("id")] = _context_period(element)
+        elif name == "unit":
+            self._units[element.get("id")] = _unit_key(element)
+
+    def collect(self, root):
+        """Gather from a parsed document, looking only at the ix elements.
+
+        Contexts and units are the children of ix:resources, whatever their
+        own prefix; lxml matches the tag names in C, so documents without
+        inline XBRL cost next to nothing.
+        """
+        for resources in root.iter("ix:resources"):
+            for element in resources:
+                self.element_closed(element)
+        for element in root.iter("ix:nonfraction"):
+            self.element_closed(element)
+
+    def company_facts(self, form="", filed="", accession=""):
+        """The collected facts as a companyfacts-shaped dict for one filing.
+
+        Returns {"facts": {taxonomy: {concept: {"units": {unit: [entry]}}}}},
+        each entry {start?, end, val, accn, form, filed}, ordered by period.
+        """
+        taxonomies = {}
+        for name, context_id, unit_id, value in self._facts:
+            period = self._contexts.get(context_id)
+            unit = self._units.get(unit_id)
+            taxonomy, _, concept = name.partition(":")
+            if period is None or not unit or not concept:
+                continue
+            entry = dict(period, val=value, accn=accession, form=form, filed=filed)
+            units = taxonomies.setdefault(taxonomy, {}).setdefault(concept, {"units": {}})["units"]
+            units.setdefault(unit, []).append(entry)
+
+        for concepts in taxonomies.values():
+            for concept in concepts.values():
+                for entries in concept["units"].values():
+                    entries.sort(key=lambda e: (e["end"], e.get("start", "")))
+        return {"facts": taxonomies}
@@ -1,35 +1,178 @@
 """Build industry landscape PowerPoint presentations."""
 
+import hashlib
 import io
+import json
 import os
-import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import requests
+from PIL import Image
 from pptx import Presentation
 from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 
+import disk_cache
+import sec_client
+
 # Logo fetch settings
-LOGO_CACHE = {}
-LOGO_TIMEOUT = 5  # seconds
+LOGO_URL = os.environ.get("LOGO_URL", "https://logo.clearbit.com/{domain}?size=128")
+LOGO_TIMEOUT = 5  # seconds, per logo
+LOGO_DEADLINE = float(os.environ.get("LOGO_DEADLINE", 15))  # seconds, for a whole deck
+LOGO_FETCH_THREADS = int(os.environ.get("LOGO_FETCH_THREADS", 16))
+
+# Splash slides show at most this many logos (5 columns x 3 rows)
+MAX_LOGOS_PER_SLIDE = 15
+
+# Logo store: fetched logos are kept on disk, keyed by domain, shared by all
+# workers and kept across restarts. Domains without a usable logo are
+# remembered too, for a shorter time, so they are retried eventually.
+LOGO_CACHE_DIR = os.environ.get("LOGO_CACHE_DIR", os.path.join(sec_client.CACHE_DIR, "logos"))
+LOGO_CACHE_MAX_BYTES = int(os.environ.get("LOGO_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+LOGO_TTL = int(os.environ.get("LOGO_TTL", 30 * 24 * 3600))
+LOGO_NEGATIVE_TTL = int(os.environ.get("LOGO_NEGATIVE_TTL", 24 * 3600))
+LOGO_MAX_BYTES = 1024 * 1024  # larger responses are not treated as logos
+
+# Formats python-pptx can embed, by content type, with their magic bytes
+LOGO_TYPES = {
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+    "image/bmp": (b"BM",),
+}
+
+# Logos are embedded at 0.9", so anything beyond LOGO_RENDER_PX (0.9" at
+# 200 dpi) only bloats the deck. Processed logos are cached by content hash.
+LOGO_RENDER_PX = 180
+
+_logo_store = disk_cache.DiskCache(LOGO_CACHE_DIR, LOGO_CACHE_MAX_BYTES)
+_processed_store = disk_cache.DiskCache(
+    os.path.join(LOGO_CACHE_DIR, "processed"), LOGO_CACHE_MAX_BYTES // 4
+)
+
+
+def _valid_logo(content_type, data):
+    """True if a response is an image python-pptx can embed."""
+    content_type = content_type.split(";")[0].strip().lower()
+    magics = LOGO_TYPES.get(content_type)
+    if not magics or not data or len(data) > LOGO_MAX_BYTES:
+        return False
+    return data.startswith(magics)
+
+
+def _cached_logo(domain):
+    """Look a domain up in the logo store.
+
+    Returns (found, logo): found is False if the domain has to be fetched
+    (never seen, or its entry expired); logo is None for a cached miss.
+    """
+    data, meta = _logo_store.get(domain)
+    if meta is None:
+        return False, None
+    ttl = LOGO_NEGATIVE_TTL if meta.get("missing") else LOGO_TTL
+    if time.time() - meta.get("fetched", 0) > ttl:
+        return False, None
+    return True, data or None
 
 
 def _fetch_logo(domain):
-    """Fetch company logo via Clearbit. Returns image bytes or None."""
-    if domain in LOGO_CACHE:
-        return LOGO_CACHE[domain]
-    url = f"https://logo.clearbit.com/{domain}?size=128"
+    """Fetch company logo via Clearbit, through the logo store. Returns image bytes or None."""
+    found, logo = _cached_logo(domain)
+    if found:
+        return logo
+    url = LOGO_URL.format(domain=domain)
     try:
         resp = requests.get(url, timeout=LOGO_TIMEOUT)
-        if resp.status_code == 200 and resp.headers.get("content-type", "").startswith("image"):
-            LOGO_CACHE[domain] = resp.content
-            return resp.content
     except Exception:
-        pass
-    LOGO_CACHE[domain] = None
+        resp = None
+    if resp is None or resp.status_code == 429 or resp.status_code >= 500:
+        # Network trouble, rate limiting and server errors say nothing about
+        # the domain: don't remember them, but fall back to an expired logo
+        # if there is one
+        data, meta = _logo_store.get(domain)
+        return data if meta and not meta.get("missing") else None
+
+    content_type = resp.headers.get("content-type", "")
+    if resp.status_code == 200 and _valid_logo(content_type, resp.content):
+        _logo_store.put(domain, resp.content, {"fetched": time.time(), "content_type": content_type})
+        return resp.content
+    _logo_store.put(domain, b"", {"fetched": time.time(), "missing": True})
     return None
 
 
+def _normalize_logo(data):
+    """Downscale a logo to LOGO_RENDER_PX and re-encode it compactly.
+
+    Tries an optimized PNG and a 256-color palette PNG and returns whichever
+    is smallest, the original bytes included, so a logo never grows. Bytes
+    Pillow cannot read are returned as they are.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            if max(img.size) > LOGO_RENDER_PX:
+                img.thumbnail((LOGO_RENDER_PX, LOGO_RENDER_PX), Image.LANCZOS)
+            candidates = [data]
+            for encoded in (img, img.quantize(256, method=Image.Quantize.FASTOCTREE)):
+                out = io.BytesIO()
+                encoded.save(out, "PNG", optimize=True)
+                candidates.append(out.getvalue())
+    except Exception:
+        return data
+    return min(candidates, key=len)
+
+
+def _processed_logo(data):
+    """_normalize_logo, cached on disk by the SHA-256 of the original bytes."""
+    key = f"{hashlib.sha256(data).hexdigest()}:{LOGO_RENDER_PX}"
+    processed, _ = _processed_store.get(key)
+    if processed is None:
+        processed = _normalize_logo(data)
+        _processed_store.put(key, processed)
+    return processed
+
+
+def _prepared_logo(domain):
+    """Fetch a domain's logo and return it ready to embed, or None."""
+    logo = _fetch_logo(domain)
+    return _processed_logo(logo) if logo else None
+
+
+def _fetch_logos(domains, deadline=LOGO_DEADLINE):
+    """Fetch logos for many domains concurrently, ready to embed.
+
+    Returns {domain: bytes or None}.
+
+    Whatever has not arrived within deadline seconds (None waits for all)
+    maps to None; stragglers finish in the background, still filling the
+    logo store, instead of holding up the request.
+    """
+    logos = {}
+    missing = []
+    for domain in dict.fromkeys(d for d in domains if d):
+        found, logo = _cached_logo(domain)
+        if found:
+            logos[domain] = _processed_logo(logo) if logo else None
+        else:
+            missing.append(domain)
+    if not missing:
+        return logos
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(LOGO_FETCH_THREADS, len(missing))))
+    try:
+        futures = {executor.submit(_prepared_logo, d): d for d in missing}
+        done, _ = wait(futures, timeout=deadline)
+        for future, domain in futures.items():
+            logos[domain] = future.result() if future in done else None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return logos
+
+
 def _add_title_slide(prs, industry_name, sub_industry_name=None):
     """Add a title slide."""
     slide_layout = prs.slide_layouts[6]  # Blank layout
@@ -71,8 +214,11 @@ def _add_title_slide(prs, industry_name, sub_industry_name=None):
     return slide
 
 
-def _add_logo_splash(prs, sub_industry_name, companies):
-    """Add a logo splash slide with company logos in a grid."""
+def _add_logo_splash(prs, sub_industry_name, companies, logos):
+    """Add a logo splash slide with company logos in a grid.
+
+    logos maps company domains to image bytes (or None), see _fetch_logos.
+    """
     slide_layout = prs.slide_layouts[6]  # Blank
     slide = prs.slides.add_slide(slide_layout)
 
@@ -113,7 +259,7 @@ def _add_logo_splash(prs, sub_industry_name, companies):
     start_x = (Inches(10) - grid_w) // 2  # Center horizontally
     start_y = Inches(1.2)
 
-    for idx, company in enumerate(companies[:cols * rows]):
+    for idx, company in enumerate(companies[:MAX_LOGOS_PER_SLIDE]):
         row = idx // cols
         col = idx % cols
         x = start_x + col * cell_w
@@ -124,7 +270,7 @@ def _add_logo_splash(prs, sub_industry_name, companies):
         cy = y
 
         # Try to add logo
-        logo_bytes = _fetch_logo(company["domain"])
+        logo_bytes = logos.get(company["domain"])
         if logo_bytes:
             stream = io.BytesIO(logo_bytes)
             try:
@@ -182,15 +328,16 @@ def _add_placeholder_circle(slide, x, y, size, name):
     tf.paragraphs[0].space_after = Pt(0)
 
 
-def build_landscape_ppt(industry, selected_sub_ids=None):
+def build_landscape_ppt(industry, selected_sub_ids=None, output=None):
     """Build a landscape PPT for an industry and selected sub-industries.
 
     Args:
         industry: dict with 'name' and 'sub_industries' list
         selected_sub_ids: set of sub-industry IDs to include (None = all)
+        output: path or writable binary file to save to (default: a new BytesIO)
 
     Returns:
-        (filepath, filename) tuple
+        (output, filename) tuple
     """
     prs = Presentation()
     prs.slide_width = Inches(10)
@@ -201,19 +348,46 @@ def build_landscape_ppt(industry, selected_sub_ids=None):
     # Title slide for the industry
     _add_title_slide(prs, industry_name)
 
+    subs = [
+        sub for sub in industry["sub_industries"]
+        if sub.get("companies") and (not selected_sub_ids or sub["id"] in selected_sub_ids)
+    ]
+
+    # Resolve every logo the deck shows up front, concurrently
+    logos = _fetch_logos(
+        company["domain"]
+        for sub in subs
+        for company in sub["companies"][:MAX_LOGOS_PER_SLIDE]
+    )
+
     # One splash slide per selected sub-industry
-    for sub in industry["sub_industries"]:
-        if selected_sub_ids and sub["id"] not in selected_sub_ids:
-            continue
-        companies = sub.get("companies", [])
-        if companies:
-            _add_logo_splash(prs, sub["name"], companies)
-
-    # Save to temp file
+    for sub in subs:
+        _add_logo_splash(prs, sub["name"], sub["companies"], logos)
+
+    # Save
     safe_name = industry_name.replace("/", "-").replace("&", "and").replace(" ", "_")
     filename = f"{safe_name}_Landscape.pptx"
-    fd, filepath = tempfile.mkstemp(suffix=".pptx")
-    os.close(fd)
-    prs.save(filepath)
-
-    return filepath, filename
+    if output is None:
+        output = io.BytesIO()
+    prs.save(output)
+
+    return output, filename
+
+
+if __name__ == "__main__":
+    # Warm the logo store for every company in industry_data.json, so
+    # landscape decks are built without touching the network.
+    data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "industry_data.json")
+    with open(data_path) as f:
+        industries = json.load(f)["industries"]
+    domains = [
+        company["domain"]
+        for industry in industries
+        for sub in industry["sub_industries"]
+        for company in sub.get("companies", [])
+    ]
+    start = time.time()
+    logos = _fetch_logos(domains, deadline=None)
+    found = sum(1 for logo in logos.values() if logo)
+    print(f"Warmed {len(logos)} domains in {time.time() - start:.1f}s: "
+          f"{found} logos, {len(logos) - found} without a logo, cache at {LOGO_CACHE_DIR}")
@@ -0,0 +1,368 @@
+"""Scan results shared by every worker process.
+
+/api/scan stores the parsed tables for a scan under its scan_id so that
+/api/generate can reuse them. Under gunicorn that second request often
+lands on another worker, so the entries live in a backend every worker can
+see (SQLite by default), with a small in-memory LRU in front of it.
+
+A scan is stored as two parts:
+
+- metadata: the filings, CIK and, per accession, an offset index into that
+  filing's table blob. Small; this is what the in-memory LRU holds.
+- one table blob per filing: every table compressed on its own and
+  concatenated (see TablePacker), so /api/generate can inflate only the
+  tables the user picked.
+
+Backends implement put(scan_id, meta_blob, table_blobs) -> created,
+get(scan_id) -> (meta_blob, created), read_tables(scan_id, accession,
+spans) and stats(), and have a ttl. The front keeps the backend's created
+time with each entry, so it never serves a scan past the backend's TTL.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+SCAN_TTL = 600  # seconds a scan stays usable for /api/generate
+
+
+def _encode(entry):
+    """Return (blob, decoded_size) for a JSON-serialisable value."""
+    raw = json.dumps(entry).encode("utf-8")
+    return zlib.compress(raw, 6), len(raw)
+
+
+def _decode(blob):
+    """Return (value, decoded_size) for a blob."""
+    raw = zlib.decompress(blob)
+    return json.loads(raw.decode("utf-8")), len(raw)
+
+
+class TablePacker:
+    """Builds one filing's table blob a table at a time.
+
+    Each table is compressed on its own and appended, and its [start, length]
+    recorded, so any table can be read back without inflating the others.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._offsets = []
+        self._pos = 0
+
+    def add(self, table):
+        part, _ = _encode(table)
+        self._offsets.append([self._pos, len(part)])
+        self._parts.append(part)
+        self._pos += len(part)
+
+    def packed(self):
+        """Return (blob, offsets) for the tables added so far."""
+        return b"".join(self._parts), list(self._offsets)
+
+
+def pack_tables(tables):
+    """Return (blob, offsets) for a list of tables; see TablePacker."""
+    packer = TablePacker()
+    for table in tables:
+        packer.add(table)
+    return packer.packed()
+
+
+def unpack_table(blob, offset):
+    """Inflate one table from a pack_tables blob given its [start, length]."""
+    start, length = offset
+    return _decode(blob[start:start + length])[0]
+
+
+class MemoryBackend:
+    """Per-process backend, for single-worker setups and development."""
+
+    def __init__(self, max_bytes, ttl=SCAN_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # scan_id -> (created, size, meta_blob, table_blobs)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _live(self, scan_id):
+        item = self._entries.get(scan_id)
+        if item is None:
+            return None
+        if time.time() - item[0] > self.ttl:
+            self._size -= self._entries.pop(scan_id)[1]
+            return None
+        self._entries.move_to_end(scan_id)
+        return item
+
+    def get(self, scan_id):
+        with self._lock:
+            item = self._live(scan_id)
+            return (item[2], item[0]) if item else (None, None)
+
+    def read_tables(self, scan_id, accession, spans):
+        with self._lock:
+            item = self._live(scan_id)
+            blob = item[3].get(accession) if item else None
+        if blob is None:
+            return None
+        return [blob[start:start + length] for start, length in spans]
+
+    def put(self, scan_id, meta_blob, table_blobs):
+        size = len(meta_blob) + sum(len(b) for b in table_blobs.values())
+        created = time.time()
+        with self._lock:
+            old = self._entries.pop(scan_id, None)
+            if old:
+                self._size -= old[1]
+            self._entries[scan_id] = (created, size, meta_blob, table_blobs)
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted[1]
+        return created
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size}
+
+
+class SQLiteBackend:
+    """Backend in a local SQLite file shared by all workers on the host."""
+
+    def __init__(self, path, max_bytes, ttl=SCAN_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scans ("
+                " scan_id TEXT PRIMARY KEY,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scans_accessed ON scans (accessed)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scan_tables ("
+                " scan_id TEXT NOT NULL,"
+                " accession TEXT NOT NULL,"
+                " blob BLOB NOT NULL,"
+                " PRIMARY KEY (scan_id, accession))"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, scan_id):
+        """Mark a live scan as used. Returns False if unknown or expired."""
+        now = time.time()
+        with conn:
+            cur = conn.execute(
+                "UPDATE scans SET accessed = ? WHERE scan_id = ? AND created >= ?",
+                (now, scan_id, now - self.ttl),
+            )
+        return cur.rowcount > 0
+
+    def get(self, scan_id):
+        conn = self._connect()
+        if not self._touch(conn, scan_id):
+            return None, None
+        row = conn.execute(
+            "SELECT payload, created FROM scans WHERE scan_id = ?", (scan_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def read_tables(self, scan_id, accession, spans):
+        conn = self._connect()
+        if not self._touch(conn, scan_id):
+            return None
+        parts = []
+        for start, length in spans:
+            # substr() slices the blob inside SQLite; only the span is returned
+            row = conn.execute(
+                "SELECT substr(blob, ?, ?) FROM scan_tables WHERE scan_id = ? AND accession = ?",
+                (start + 1, length, scan_id, accession),
+            ).fetchone()
+            if row is None:
+                return None
+            parts.append(row[0])
+        return parts
+
+    def put(self, scan_id, meta_blob, table_blobs):
+        conn = self._connect()
+        now = time.time()
+        size = len(meta_blob) + sum(len(b) for b in table_blobs.values())
+        with conn:
+            self._delete(conn, scan_id)
+            conn.execute(
+                "INSERT INTO scans (scan_id, created, accessed, size, payload)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (scan_id, now, now, size, meta_blob),
+            )
+            conn.executemany(
+                "INSERT INTO scan_tables (scan_id, accession, blob) VALUES (?, ?, ?)",
+                [(scan_id, accession, blob) for accession, blob in table_blobs.items()],
+            )
+            for (expired,) in conn.execute(
+                "SELECT scan_id FROM scans WHERE created < ?", (now - self.ttl,)
+            ).fetchall():
+                self._delete(conn, expired)
+            self._evict(conn)
+        return now
+
+    def _delete(self, conn, scan_id):
+        conn.execute("DELETE FROM scans WHERE scan_id = ?", (scan_id,))
+        conn.execute("DELETE FROM scan_tables WHERE scan_id = ?", (scan_id,))
+
+    def _evict(self, conn):
+        """Drop least recently used scans until the total size fits the cap."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM scans").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for scan_id, size in conn.execute(
+            "SELECT scan_id, size FROM scans ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(conn, scan_id)
+            total -= size
+
+    def stats(self):
+        row = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scans"
+        ).fetchone()
+        return {"entries": row[0], "bytes": row[1]}
+
+
+class ScanCache:
+    """Shared backend with a per-process LRU of decoded metadata in front.
+
+    The front is bounded by the metadata's decoded JSON size; table rows
+    never sit in the front, they are read from the backend on demand.
+    """
+
+    def __init__(self, backend, front_max_bytes):
+        self.backend = backend
+        self.front_max_bytes = front_max_bytes
+        self._front = OrderedDict()  # scan_id -> (created, size, meta)
+        self._front_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"front_hits": 0, "backend_hits": 0, "misses": 0, "tables_loaded": 0}
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def _remember(self, scan_id, created, size, meta):
+        with self._lock:
+            old = self._front.pop(scan_id, None)
+            if old:
+                self._front_size -= old[1]
+            self._front[scan_id] = (created, size, meta)
+            self._front_size += size
+            while self._front_size > self.front_max_bytes and self._front:
+                _, (_, evicted_size, _) = self._front.popitem(last=False)
+                self._front_size -= evicted_size
+
+    def _forget(self, scan_id):
+        with self._lock:
+            old = self._front.pop(scan_id, None)
+            if old:
+                self._front_size -= old[1]
+
+    def get(self, scan_id):
+        """Return the metadata stored for scan_id, or None if unknown or expired."""
+        if not scan_id:
+            return None
+        with self._lock:
+            item = self._front.get(scan_id)
+            if item and time.time() - item[0] <= self.backend.ttl:
+                self._front.move_to_end(scan_id)
+                self._stats["front_hits"] += 1
+                return item[2]
+
+        blob, created = self.backend.get(scan_id)
+        if blob is None:
+            self._forget(scan_id)
+            self._count("misses")
+            return None
+        self._count("backend_hits")
+        meta, size = _decode(blob)
+        self._remember(scan_id, created, size, meta)
+        return meta
+
+    def get_tables(self, scan_id, accession, indices):
+        """Load just the given tables of one filing. Returns {index: table}.
+
+        The backend may have evicted the scan although the front still knows
+        it; then nothing is returned and the front entry is dropped.
+        """
+        meta = self.get(scan_id)
+        if meta is None:
+            return {}
+        offsets = meta.get("offsets", {}).get(accession, [])
+        indices = [i for i in indices if 0 <= i < len(offsets)]
+        if not indices:
+            return {}
+        parts = self.backend.read_tables(scan_id, accession, [offsets[i] for i in indices])
+        if parts is None:
+            self._forget(scan_id)
+            return {}
+        self._count("tables_loaded", len(indices))
+        return {i: _decode(part)[0] for i, part in zip(indices, parts)}
+
+    def put(self, scan_id, meta, packed_by_filing):
+        """Store a scan.
+
+        meta is a JSON-serialisable dict; packed_by_filing maps accession to
+        a (blob, offsets) pair from pack_tables. The offsets are added to the
+        stored metadata under "offsets".
+        """
+        meta = dict(meta)
+        meta["offsets"] = {acc: offsets for acc, (_, offsets) in packed_by_filing.items()}
+        blob, size = _encode(meta)
+        created = self.backend.put(scan_id, blob, {acc: b for acc, (b, _) in packed_by_filing.items()})
+        self._remember(scan_id, created, size, meta)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["front_entries"] = len(self._front)
+            stats["front_bytes"] = self._front_size
+        stats["backend"] = self.backend.stats()
+        return stats
+
+
+def from_env(cache_dir):
+    """Build the scan cache configured by SCAN_CACHE_* environment variables.
+
+    SCAN_CACHE_BACKEND is "sqlite" (default, shared by workers) or "memory";
+    SCAN_CACHE_MAX_BYTES caps the backend's compressed size and
+    SCAN_CACHE_FRONT_BYTES the per-process metadata LRU. The SQLite file is
+    SCAN_CACHE_PATH, by default scans.sqlite3 in cache_dir.
+    """
+    kind = os.environ.get("SCAN_CACHE_BACKEND", "sqlite")
+    max_bytes = int(os.environ.get("SCAN_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    front_bytes = int(os.environ.get("SCAN_CACHE_FRONT_BYTES", 4 * 1024 * 1024))
+
+    if kind == "memory":
+        backend = MemoryBackend(max_bytes)
+    elif kind == "sqlite":
+        path = os.environ.get("SCAN_CACHE_PATH", os.path.join(cache_dir, "scans.sqlite3"))
+        backend = SQLiteBackend(path, max_bytes)
+    else:
+        raise ValueError(f"Unknown SCAN_CACHE_BACKEND: {kind}")
+    return ScanCache(backend, front_bytes)
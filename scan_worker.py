@@ -0,0 +1,41 @@
+"""Filing parsing as run in the scan pipeline's parse processes.
+
+Kept apart from app so that a parse process (started by forkserver, see
+app._get_parse_pool) only needs the parsers. Under `python app.py` the
+processes also re-run app.py as __mp_main__, which skips the server's
+start-up work (app._start_server).
+"""
+
+import time
+
+import html_parser
+import ixbrl
+import scan_cache
+
+
+def table_shape(table):
+    """Title and dimensions of a parsed table, all the scan listing needs."""
+    rows = table.get("rows", [])
+    return {
+        "title": table.get("title"),
+        "rows": len(rows),
+        "cols": len(rows[0]) if rows else 0,
+    }
+
+
+def parse_filing_html(html_content):
+    """Extract tables from one document. Runs in the parse pool.
+
+    Returns ({"shapes", "packed", "facts"}, seconds): row data only leaves
+    the pool already compressed, see scan_cache.TablePacker; facts holds the
+    document's inline XBRL facts (an ixbrl.FactCollector).
+    """
+    start = time.perf_counter()
+    facts = ixbrl.FactCollector()
+    tables = html_parser.extract_tables(html_content, facts=facts)
+    scanned = {
+        "shapes": [table_shape(t) for t in tables],
+        "packed": scan_cache.pack_tables(tables),
+        "facts": facts,
+    }
+    return scanned, time.perf_counter() - start
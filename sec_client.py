@@ -1,76 +1,544 @@
-import requests
+import hashlib
+import itertools
+import json
+import os
+import struct
+import tempfile
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+import requests
+from requests.adapters import HTTPAdapter
+
+import company_search
+import disk_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: the limiter falls back to per-process only
+    fcntl = None
+
 HEADERS = {
     "User-Agent": "SECToExcel/1.0 (sec-to-excel@example.com)",
     "Accept-Encoding": "gzip, deflate",
 }
 
-# Cache the company tickers list in memory
+# Connection pool sizing for the shared session. pool_connections is the
+# number of per-host pools kept (www.sec.gov and data.sec.gov today),
+# pool_maxsize the number of keep-alive connections kept open per host.
+POOL_CONNECTIONS = int(os.environ.get("SEC_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.environ.get("SEC_POOL_MAXSIZE", 10))
+
+_session = None
+_session_lock = threading.Lock()
+
+# Token bucket shared by every worker on the host. SEC allows 10 req/s;
+# BURST + PER_SEC stays under that in any one-second window. The bucket
+# state (tokens, timestamp) lives in a small file guarded by flock so all
+# gunicorn workers draw from the same budget.
+RATE_LIMIT_PER_SEC = float(os.environ.get("SEC_RATE_LIMIT", 7))
+RATE_LIMIT_BURST = float(os.environ.get("SEC_RATE_BURST", 3))
+RATE_LIMIT_FILE = os.environ.get(
+    "SEC_RATE_LIMIT_FILE",
+    os.path.join(tempfile.gettempdir(), "sec_to_excel_ratelimit"),
+)
+
+_bucket_lock = threading.Lock()
+_local_bucket = [RATE_LIMIT_BURST, 0.0]
+_rate_stats = {"requests": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+# On-disk response cache, shared by all workers and kept across restarts.
+# Documents under /Archives/edgar/data/ never change once published and are
+# served from disk forever; everything else (submissions, companyfacts,
+# ticker list) is served from disk for CACHE_FRESH_SECONDS and then
+# revalidated with If-None-Match / If-Modified-Since.
+CACHE_DIR = os.environ.get(
+    "SEC_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "sec_to_excel_cache"),
+)
+CACHE_MAX_BYTES = int(os.environ.get("SEC_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_FRESH_SECONDS = int(os.environ.get("SEC_CACHE_FRESH_SECONDS", 600))
+
+_http_cache = disk_cache.DiskCache(os.path.join(CACHE_DIR, "http"), CACHE_MAX_BYTES)
+_cache_stats = {"hits": 0, "revalidated": 0, "misses": 0, "coalesced": 0}
+_cache_stats_lock = threading.Lock()
+
+# Single flight: concurrent fetches of the same URL share one download.
+# Within a worker, threads queue on a per-URL lock; across workers, on a
+# lockf'd lock file (URLs are hashed onto FLIGHT_LOCK_STRIPES files, and a
+# stripe lock is shared by all threads of the worker holding it). Once
+# the lock is theirs, waiters re-check the disk cache, where the first
+# download has just put its response. A waiter gives up after
+# SINGLE_FLIGHT_WAIT seconds and fetches on its own.
+FLIGHT_LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+FLIGHT_LOCK_STRIPES = 1024
+SINGLE_FLIGHT_WAIT = 60
+
+_flights = {}  # url -> [threading.Lock, number of holders and waiters]
+_stripes = {}  # stripe -> [fd holding its lock, number of holders]
+_flights_lock = threading.Lock()
+
+# Cache the company tickers list in memory, with its search index. The list
+# is also kept as a local snapshot so a fresh worker can serve search at
+# once; when it is older than CACHE_TTL the stale list keeps being served
+# while a background thread refreshes it.
 _company_tickers_cache = None
+_company_index = None
 _cache_time = None
 CACHE_TTL = 3600  # 1 hour
+TICKERS_SNAPSHOT = os.environ.get(
+    "SEC_TICKERS_SNAPSHOT", os.path.join(CACHE_DIR, "company_tickers.json")
+)
+TICKERS_WAIT = 60  # seconds a request waits when there is no list at all
+TICKERS_RETRY = 60  # seconds between background refresh attempts
 
+_tickers_lock = threading.Lock()
+_tickers_refresh = None  # thread of the running refresh, if any
+_tickers_attempted = 0.0  # when the last refresh started
+_tickers_error = None  # last refresh failure
 
-def _rate_limit():
-    """Sleep briefly to respect SEC's 10 req/s limit."""
-    time.sleep(0.12)
 
+def _reserve_token():
+    """Take one token from the shared bucket. Returns seconds to wait for it.
 
-def _get_company_tickers():
-    """Fetch and cache the SEC company tickers JSON."""
-    global _company_tickers_cache, _cache_time
-    if _company_tickers_cache and _cache_time and (time.time() - _cache_time < CACHE_TTL):
-        return _company_tickers_cache
-
-    _rate_limit()
-    resp = requests.get(
-        "https://www.sec.gov/files/company_tickers.json",
-        headers=HEADERS,
-        timeout=30,
-    )
-    resp.raise_for_status()
-    data = resp.json()
+    Tokens may go negative: each caller reserves the next free slot, so
+    concurrent callers are spaced out instead of retrying in a loop.
+    """
+    with _bucket_lock:
+        fd = None
+        if fcntl is not None:
+            try:
+                fd = os.open(RATE_LIMIT_FILE, os.O_RDWR | os.O_CREAT, 0o666)
+            except OSError:
+                fd = None
+        try:
+            now = time.time()
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.pread(fd, 16, 0)
+                tokens, stamp = struct.unpack("dd", raw) if len(raw) == 16 else (RATE_LIMIT_BURST, now)
+            else:
+                tokens, stamp = _local_bucket
+
+            elapsed = max(0.0, now - stamp)
+            tokens = min(RATE_LIMIT_BURST, tokens + elapsed * RATE_LIMIT_PER_SEC) - 1
+
+            if fd is not None:
+                os.pwrite(fd, struct.pack("dd", tokens, now), 0)
+            else:
+                _local_bucket[:] = [tokens, now]
+        finally:
+            if fd is not None:
+                os.close(fd)  # also releases the flock
+
+    return -tokens / RATE_LIMIT_PER_SEC if tokens < 0 else 0.0
+
+
+def _rate_limit():
+    """Wait for a token to respect SEC's 10 req/s limit. Returns seconds waited."""
+    wait = _reserve_token()
+    if wait > 0:
+        time.sleep(wait)
+
+    with _bucket_lock:
+        _rate_stats["requests"] += 1
+        if wait > 0:
+            _rate_stats["waited"] += 1
+            _rate_stats["total_wait"] += wait
+            _rate_stats["max_wait"] = max(_rate_stats["max_wait"], wait)
+    return wait
+
+
+def get_rate_limit_stats():
+    """Report how often and how long this worker waited on the shared bucket."""
+    with _bucket_lock:
+        stats = dict(_rate_stats)
+    stats["total_wait"] = round(stats["total_wait"], 3)
+    stats["max_wait"] = round(stats["max_wait"], 3)
+    return stats
+
+
+def _get_session():
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=False,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _is_immutable(url):
+    """Filing archive documents never change once published."""
+    return "/Archives/edgar/data/" in url
+
+
+def _cached_response(url, body, meta):
+    """Rebuild a requests.Response from a cache entry."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.reason = "OK"
+    resp.url = url
+    resp._content = body
+    resp.encoding = meta.get("encoding")
+    if meta.get("content_type"):
+        resp.headers["Content-Type"] = meta["content_type"]
+    resp.from_cache = True
+    resp.rate_limit_wait = 0.0
+    return resp
+
+
+def _cache_meta(url, resp):
+    """Metadata stored alongside a cached response body."""
+    return {
+        "url": url,
+        "immutable": _is_immutable(url),
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "content_type": resp.headers.get("Content-Type"),
+        "encoding": resp.encoding,
+        "checked": time.time(),
+    }
+
+
+class _Flight:
+    """The fetch lock for one URL; see SINGLE_FLIGHT_WAIT."""
+
+    def __init__(self, url):
+        self.url = url
+        self._entry = None
+        self._held = False
+        self._stripe = None
+
+    def acquire(self):
+        """Take the lock. Returns True if another fetch of the URL was waited for."""
+        with _flights_lock:
+            self._entry = _flights.setdefault(self.url, [threading.Lock(), 0])
+            self._entry[1] += 1
+        deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+        lock = self._entry[0]
+        waited = not lock.acquire(blocking=False)
+        if waited and not lock.acquire(timeout=SINGLE_FLIGHT_WAIT):
+            return True
+        self._held = True
+
+        if fcntl is not None:
+            stripe = int(hashlib.sha256(self.url.encode("utf-8")).hexdigest(), 16) % FLIGHT_LOCK_STRIPES
+            if self._lock_stripe(stripe, deadline):
+                waited = True
+        return waited
+
+    def _lock_stripe(self, stripe, deadline):
+        """Hold a stripe's lock file, shared with this worker's other holders.
+
+        Returns True if another worker held it and we had to wait.
+
+        The lock is a POSIX record lock (lockf), which, unlike flock, a
+        forked child does not inherit, so no child process can keep a stripe
+        locked after this worker lets go. Record locks belong to the process
+        and drop when any descriptor of the file is closed, so the file is
+        only opened, locked and closed under _flights_lock, and only while
+        no other thread of this worker holds the stripe.
+        """
+        try:
+            os.makedirs(FLIGHT_LOCK_DIR, exist_ok=True)
+        except OSError:
+            return False
+        path = os.path.join(FLIGHT_LOCK_DIR, f"{stripe}.lock")
+
+        waited = False
+        while True:
+            with _flights_lock:
+                held = _stripes.get(stripe)
+                if held:
+                    held[1] += 1
+                    self._stripe = stripe
+                    return waited
+                try:
+                    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+                except OSError:
+                    return waited
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                else:
+                    _stripes[stripe] = [fd, 1]
+                    self._stripe = stripe
+                    return waited
+            waited = True
+            if time.monotonic() >= deadline:
+                return waited
+            time.sleep(0.05)
+
+    def release(self, blocking=True):
+        """Release the lock; safe to call more than once.
+
+        Finalizers pass blocking=False: run by the garbage collector, they
+        may interrupt this very thread inside _flights_lock, so if the lock
+        is busy the release is left to a short-lived thread instead.
+        """
+        if not _flights_lock.acquire(blocking=blocking):
+            threading.Thread(target=self.release, daemon=True).start()
+            return
+        try:
+            if self._stripe is not None:
+                held = _stripes[self._stripe]
+                held[1] -= 1
+                if held[1] == 0:
+                    del _stripes[self._stripe]
+                    os.close(held[0])  # also releases the lock
+                self._stripe = None
+            if self._held:
+                self._entry[0].release()
+                self._held = False
+            if self._entry is not None:
+                self._entry[1] -= 1
+                if self._entry[1] == 0 and _flights.get(self.url) is self._entry:
+                    del _flights[self.url]
+                self._entry = None
+        finally:
+            _flights_lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _count(stat):
+    with _cache_stats_lock:
+        _cache_stats[stat] += 1
+
+
+def _conditional_headers(meta):
+    """Revalidation headers for a stale cache entry."""
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _is_fresh(meta):
+    return meta.get("immutable") or time.time() - meta.get("checked", 0) < CACHE_FRESH_SECONDS
+
+
+def _get(url, timeout=30):
+    """Rate-limited, disk-cached GET through the shared session.
+
+    The time spent waiting on the rate limiter is recorded on the response
+    as ``rate_limit_wait`` (seconds); ``from_cache`` is True when the body
+    came from the disk cache.
+    """
+    body, meta = _http_cache.get(url)
+    if body is not None and _is_fresh(meta):
+        _count("hits")
+        return _cached_response(url, body, meta)
+
+    with _Flight(url) as waited:
+        if waited:
+            # Another thread or worker was fetching this URL; use its result
+            body, meta = _http_cache.get(url)
+            if body is not None and _is_fresh(meta):
+                _count("coalesced")
+                return _cached_response(url, body, meta)
+        conditional = _conditional_headers(meta) if body is not None else {}
+
+        wait = _rate_limit()
+        resp = _get_session().get(url, timeout=timeout, headers=conditional)
+
+        if resp.status_code == 304 and body is not None:
+            _count("revalidated")
+            meta["checked"] = time.time()
+            _http_cache.put_meta(url, meta)
+            resp = _cached_response(url, body, meta)
+            resp.rate_limit_wait = wait
+            return resp
+
+        _count("misses")
+        if resp.status_code == 200:
+            _http_cache.put(url, resp.content, _cache_meta(url, resp))
+        resp.from_cache = False
+        resp.rate_limit_wait = wait
+        return resp
+
+
+def get_cache_stats():
+    """Report disk cache hits, 304 revalidations and misses for this worker."""
+    with _cache_stats_lock:
+        return dict(_cache_stats)
+
+
+def get_pool_stats():
+    """Report per-host connection reuse for the shared session.
+
+    Returns {host: {connections, requests, reuse_ratio}} where reuse_ratio is
+    the fraction of requests that were served on an already-open connection.
+    """
+    if _session is None:
+        return {}
+
+    stats = {}
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}"
+            entry = stats.setdefault(host, {"connections": 0, "requests": 0})
+            entry["connections"] += pool.num_connections
+            entry["requests"] += pool.num_requests
 
-    # Convert from {0: {cik_str, ticker, title}, 1: ...} to list
-    tickers = []
-    for entry in data.values():
-        tickers.append({
-            "cik": str(entry["cik_str"]),
-            "ticker": entry["ticker"],
-            "name": entry["title"],
-        })
+    for entry in stats.values():
+        reqs = entry["requests"]
+        entry["reuse_ratio"] = round(1 - entry["connections"] / reqs, 3) if reqs else 0.0
+    return stats
 
+
+def _set_company_tickers(tickers, fetched):
+    """Install a ticker list and its search index."""
+    global _company_tickers_cache, _company_index, _cache_time
+    _company_index = company_search.CompanyIndex(tickers)
     _company_tickers_cache = tickers
-    _cache_time = time.time()
-    return tickers
+    _cache_time = fetched
+
+
+def _load_tickers_snapshot():
+    """Install the ticker list from the local snapshot. Returns False if there is none."""
+    try:
+        with open(TICKERS_SNAPSHOT, "r") as f:
+            snapshot = json.load(f)
+        _set_company_tickers(snapshot["tickers"], snapshot["fetched"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    return True
+
+
+def _write_tickers_snapshot(tickers, fetched):
+    directory = os.path.dirname(TICKERS_SNAPSHOT) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"fetched": fetched, "tickers": tickers}, f)
+        os.replace(tmp_path, TICKERS_SNAPSHOT)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _refresh_company_tickers():
+    """Download the SEC company tickers JSON, install it and snapshot it."""
+    global _tickers_error
+    try:
+        resp = _get("https://www.sec.gov/files/company_tickers.json", timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+
+        # Convert from {0: {cik_str, ticker, title}, 1: ...} to list
+        tickers = []
+        for entry in data.values():
+            tickers.append({
+                "cik": str(entry["cik_str"]),
+                "ticker": entry["ticker"],
+                "name": entry["title"],
+            })
+
+        fetched = time.time()
+        _set_company_tickers(tickers, fetched)
+        _write_tickers_snapshot(tickers, fetched)
+        _tickers_error = None
+    except Exception as e:
+        _tickers_error = e
+
+
+def _refresh_in_background():
+    """Start a ticker refresh unless one is already running. Returns its thread."""
+    global _tickers_refresh, _tickers_attempted
+    with _tickers_lock:
+        if _tickers_refresh is None or not _tickers_refresh.is_alive():
+            _tickers_attempted = time.time()
+            _tickers_refresh = threading.Thread(
+                target=_refresh_company_tickers, name="sec-tickers-refresh", daemon=True
+            )
+            _tickers_refresh.start()
+        return _tickers_refresh
+
+
+def warm_company_tickers():
+    """Load the ticker snapshot and refresh it in the background if stale.
+
+    Call at startup so the first search in a worker does not wait.
+    """
+    if _company_tickers_cache is None:
+        _load_tickers_snapshot()
+    if _company_tickers_cache is None:
+        _refresh_in_background()
+    elif (time.time() - _cache_time >= CACHE_TTL
+          and time.time() - _tickers_attempted >= TICKERS_RETRY):
+        _refresh_in_background()
+
+
+def _get_company_tickers():
+    """Return the cached SEC company tickers list.
+
+    A stale list is returned as is while a background refresh runs; only
+    when there is no list at all (no snapshot yet) does this wait for the
+    download.
+    """
+    warm_company_tickers()
+    if _company_tickers_cache is None:
+        _refresh_in_background().join(TICKERS_WAIT)
+        if _company_tickers_cache is None:
+            raise RuntimeError(f"Company ticker list unavailable: {_tickers_error}")
+    return _company_tickers_cache
 
 
 def search_company(query):
-    """Search for companies by name or ticker. Returns top 15 matches."""
-    tickers = _get_company_tickers()
-    query_lower = query.lower().strip()
-    if not query_lower:
-        return []
+    """Search for companies by name or ticker. Returns top 15 matches.
+
+    Exact ticker matches come first, then tickers or names starting with
+    the query, then ones containing it (see company_search.CompanyIndex).
+    """
+    _get_company_tickers()
+    return _company_index.search(query, limit=15)
+
 
-    exact_ticker = []
-    starts_with = []
-    contains = []
+# Older submissions pages of long-history filers are fetched concurrently;
+# the shared rate limiter still spaces the requests out.
+SUBMISSIONS_PAGE_THREADS = 4
 
-    for co in tickers:
-        ticker_lower = co["ticker"].lower()
-        name_lower = co["name"].lower()
 
-        if ticker_lower == query_lower:
-            exact_ticker.append(co)
-        elif ticker_lower.startswith(query_lower) or name_lower.startswith(query_lower):
-            starts_with.append(co)
-        elif query_lower in ticker_lower or query_lower in name_lower:
-            contains.append(co)
+def _page_in_range(file_entry, cutoff):
+    """False if a submissions page only holds filings from before cutoff."""
+    try:
+        filing_to = datetime.strptime(file_entry.get("filingTo", ""), "%Y-%m-%d")
+    except ValueError:
+        return True  # no usable range: fetch it to be safe
+    return filing_to >= cutoff
 
-    results = exact_ticker + starts_with + contains
-    return results[:15]
+
+def _get_submissions_page(name):
+    """Fetch one older submissions page. Returns its JSON, or None if unavailable."""
+    file_resp = _get(f"https://data.sec.gov/submissions/{name}", timeout=30)
+    return file_resp.json() if file_resp.ok else None
 
 
 def get_filings(cik, filing_types=None, years=5):
@@ -82,12 +550,7 @@ def get_filings(cik, filing_types=None, years=5):
         filing_types = ["10-K", "10-Q", "8-K"]
 
     cik_padded = cik.zfill(10)
-    _rate_limit()
-    resp = requests.get(
-        f"https://data.sec.gov/submissions/CIK{cik_padded}.json",
-        headers=HEADERS,
-        timeout=30,
-    )
+    resp = _get(f"https://data.sec.gov/submissions/CIK{cik_padded}.json", timeout=30)
     resp.raise_for_status()
     data = resp.json()
 
@@ -139,51 +602,233 @@ def get_filings(cik, filing_types=None, years=5):
         recent = data.get("filings", data).get("recent", data.get("recent", {}))
         process_filing_batch(recent)
 
-    # Process older filing files if they exist
-    for file_entry in data.get("filings", {}).get("files", []):
-        _rate_limit()
-        file_resp = requests.get(
-            f"https://data.sec.gov/submissions/{file_entry['name']}",
-            headers=HEADERS,
-            timeout=30,
-        )
-        if file_resp.ok:
-            process_filing_batch(file_resp.json())
+    # Process older filing files if they exist, skipping pages whose declared
+    # date range (filingFrom..filingTo) ends before the cutoff
+    pages = [
+        file_entry["name"]
+        for file_entry in data.get("filings", {}).get("files", [])
+        if _page_in_range(file_entry, cutoff)
+    ]
+    if pages:
+        threads = min(SUBMISSIONS_PAGE_THREADS, len(pages))
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for page in executor.map(_get_submissions_page, pages):
+                if page is not None:
+                    process_filing_batch(page)
 
     # Sort by date descending
     filings.sort(key=lambda f: f["date"], reverse=True)
     return filings
 
 
-def get_xbrl_facts(cik):
-    """Fetch all XBRL company facts for a CIK."""
+# Every concept object in a companyfacts payload opens with its label, so in
+# the compact JSON SEC serves, a concept key is always followed by this.
+_CONCEPT_MARKER = b'":{"label":'
+
+
+def _select_facts(data, concepts, taxonomy):
+    """Cut a fully decoded companyfacts payload down to the wanted concepts."""
+    result = {key: value for key, value in data.items() if key != "facts"}
+    facts = data.get("facts", {}).get(taxonomy, {})
+    result["facts"] = {taxonomy: {c: v for c, v in facts.items() if c in concepts}}
+    return result
+
+
+def _decode_selected_facts(chunks, concepts, taxonomy="us-gaap"):
+    """Decode only the wanted concepts from a streamed companyfacts payload.
+
+    Scans the raw bytes for concept keys and JSON-decodes just the values
+    of concepts in the given taxonomy that are in `concepts`; everything
+    else is skipped without building Python objects. Only the bytes of the
+    concept currently being read are buffered.
+
+    Returns a companyfacts-shaped dict: {cik, entityName, facts: {taxonomy:
+    {concept: {...}}}}.
+    """
+    chunks = iter(chunks)
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) >= 64:
+            break
+    if not buf.lstrip().startswith(b'{"cik":'):
+        # Not the compact layout this scanner relies on: decode it all.
+        return _select_facts(json.loads(bytes(buf) + b"".join(chunks)), concepts, taxonomy)
+
+    decoder = json.JSONDecoder()
+    result = {"facts": {taxonomy: {}}}
+    wanted = result["facts"][taxonomy]
+    head_done = False
+    current_taxonomy = None
+    pending = None  # wanted concept whose value starts at value_start
+    value_start = 0  # start of the most recent concept's value in buf
+    scan_from = 0  # where to resume looking for the next marker
+
+    def finish(concept, value_bytes):
+        # value_bytes may carry trailing "}}," etc.; raw_decode stops at the value
+        wanted[concept] = decoder.raw_decode(value_bytes.decode("utf-8"))[0]
+
+    for chunk in itertools.chain([b""], chunks):
+        buf += chunk
+
+        if not head_done:
+            facts_at = buf.find(b'"facts":')
+            if facts_at < 0 or len(buf) < facts_at + 10:
+                continue
+            if buf[facts_at + 8:facts_at + 10] != b'{"':
+                # Whitespace between keys and values (or no facts at all):
+                # the marker would never match, so decode it all.
+                return _select_facts(json.loads(bytes(buf) + b"".join(chunks)), concepts, taxonomy)
+            result.update(json.loads(bytes(buf[:facts_at]).rstrip(b", \n") + b"}"))
+            head_done = True
+
+        while True:
+            marker_at = buf.find(_CONCEPT_MARKER, scan_from)
+            if marker_at < 0:
+                scan_from = max(scan_from, len(buf) - len(_CONCEPT_MARKER) + 1)
+                break
+            key_start = buf.rfind(b'"', 0, marker_at) + 1
+            if pending:
+                finish(pending, buf[value_start:key_start - 1])
+                pending = None
+
+            if buf[key_start - 2:key_start - 1] == b"{":
+                # First concept of a taxonomy: "<taxonomy>":{"<concept>":{"label":
+                name_end = key_start - 4
+                current_taxonomy = buf[buf.rfind(b'"', 0, name_end) + 1:name_end].decode("utf-8")
+
+            concept = buf[key_start:marker_at].decode("utf-8")
+            value_start = scan_from = marker_at + 2
+            if current_taxonomy == taxonomy and concept in concepts:
+                pending = concept
+
+        # Everything before the current concept's value is done with.
+        del buf[:value_start]
+        scan_from -= value_start
+        value_start = 0
+
+    if pending:
+        finish(pending, buf[value_start:])
+    return result
+
+
+def get_xbrl_facts(cik, concepts=None):
+    """Fetch XBRL company facts for a CIK.
+
+    With `concepts`, only those us-gaap concepts are decoded, straight off
+    the response stream, instead of the whole (often tens of MB) payload.
+    """
     cik_padded = cik.zfill(10)
-    _rate_limit()
-    resp = requests.get(
-        f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik_padded}.json",
-        headers=HEADERS,
-        timeout=60,
-    )
-    resp.raise_for_status()
-    return resp.json()
+    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik_padded}.json"
+    if concepts is None:
+        resp = _get(url, timeout=60)
+        resp.raise_for_status()
+        return resp.json()
+
+    chunks, _, _ = _open_stream(url, timeout=60)
+    return _decode_selected_facts(chunks, set(concepts))
 
 
 def get_filing_html(url):
     """Download the HTML content of a specific filing document."""
-    _rate_limit()
-    resp = requests.get(url, headers=HEADERS, timeout=60)
+    resp = _get(url, timeout=60)
     resp.raise_for_status()
     return resp.text
 
 
+def _read_chunks(f, chunk_size):
+    """Yield a cached payload file in chunks, closing it when done."""
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _open_stream(url, timeout=60, chunk_size=64 * 1024):
+    """Streaming counterpart of _get.
+
+    Returns (chunks, encoding, rate_limit_wait): an iterator of raw body
+    bytes, the declared encoding (None if the server sent none) and, as
+    _get records on its responses, the seconds spent waiting on the rate
+    limiter. Fresh cache entries are read from disk; stale ones are
+    revalidated, and a new body is written through to the cache as it is
+    read.
+    """
+    f, meta = _http_cache.open(url)
+    if f is not None and _is_fresh(meta):
+        _count("hits")
+        return _read_chunks(f, chunk_size), meta.get("encoding"), 0.0
+
+    # The flight lock is held until the body has been streamed into the cache
+    flight = _Flight(url)
+    try:
+        if flight.acquire():
+            if f is not None:
+                f.close()
+            f, meta = _http_cache.open(url)
+            if f is not None and _is_fresh(meta):
+                flight.release()
+                _count("coalesced")
+                return _read_chunks(f, chunk_size), meta.get("encoding"), 0.0
+        conditional = _conditional_headers(meta) if f is not None else {}
+
+        wait = _rate_limit()
+        resp = _get_session().get(url, timeout=timeout, headers=conditional, stream=True)
+    except BaseException:
+        if f is not None:
+            f.close()
+        flight.release()
+        raise
+
+    if resp.status_code == 304 and f is not None:
+        resp.close()
+        flight.release()
+        _count("revalidated")
+        meta["checked"] = time.time()
+        _http_cache.put_meta(url, meta)
+        return _read_chunks(f, chunk_size), meta.get("encoding"), wait
+
+    if f is not None:
+        f.close()
+    _count("misses")
+    try:
+        resp.raise_for_status()
+    except Exception:
+        resp.close()
+        flight.release()
+        raise
+
+    meta = _cache_meta(url, resp)
+
+    def read_network():
+        try:
+            with resp:
+                yield from _http_cache.put_stream(url, resp.iter_content(chunk_size), meta)
+        finally:
+            flight.release(blocking=False)  # may run when the stream is collected
+
+    chunks = read_network()
+    # A stream dropped before it is read never enters that finally
+    weakref.finalize(chunks, flight.release, False)
+    return chunks, resp.encoding, wait
+
+
+def stream_filing_html(url, chunk_size=64 * 1024):
+    """Stream a filing document instead of buffering it.
+
+    Returns (chunks, encoding, rate_limit_wait); see _open_stream.
+    """
+    return _open_stream(url, timeout=60, chunk_size=chunk_size)
+
+
 def get_filing_index(cik, accession):
     """Get the filing index page to find all documents in a filing."""
     cik_num = str(int(cik))
     accession_no_dash = accession.replace("-", "")
-    _rate_limit()
-    resp = requests.get(
+    resp = _get(
         f"https://www.sec.gov/Archives/edgar/data/{cik_num}/{accession_no_dash}/index.json",
-        headers=HEADERS,
         timeout=30,
     )
     resp.raise_for_status()
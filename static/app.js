@@ -391,7 +391,8 @@ btnScan.addEventListener("click", async () => {
         }));
 
     try {
-        const resp = await fetch("/api/scan", {
+        // Tables arrive as newline-delimited JSON while the filings are parsed
+        const resp = await fetch("/api/scan/stream", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
@@ -400,18 +401,60 @@ btnScan.addEventListener("click", async () => {
             }),
         });
 
-        const data = await resp.json();
-
-        if (!resp.ok || data.error) {
-            throw new Error(data.error || `Server error ${resp.status}`);
+        if (!resp.ok) {
+            let message = `Server error ${resp.status}`;
+            try {
+                message = (await resp.json()).error || message;
+            } catch (_) {}
+            throw new Error(message);
         }
 
-        currentScanId = data.scan_id;
-        scannedTables = data.tables;
+        currentScanId = null;
+        scannedTables = [];
         selectedTableIds.clear();
-
         renderTables();
         stepTables.classList.remove("hidden");
+
+        // Returns true if the line added a table
+        const failed = [];
+        const handleLine = (line) => {
+            if (!line.trim()) return false;
+            const msg = JSON.parse(line);
+            if (msg.table) {
+                scannedTables.push(msg.table);
+                return true;
+            }
+            if (msg.filing && msg.filing.error) {
+                failed.push(msg.filing.error);
+            } else if (msg.scan_id) {
+                currentScanId = msg.scan_id;
+            }
+            return false;
+        };
+
+        // Re-render once per chunk read, not once per table line
+        const reader = resp.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = "";
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split("\n");
+            buffered = lines.pop();
+            const added = lines.map(handleLine).some(Boolean);
+            if (added) renderTables();
+        }
+        if (handleLine(buffered + decoder.decode())) renderTables();
+
+        if (!currentScanId) {
+            throw new Error("Scan ended before it completed");
+        }
+        if (failed.length > 0) {
+            scanError.textContent = `Some filings could not be scanned: ${failed.join("; ")}`;
+            scanError.classList.remove("hidden");
+        }
+
         stepGenerate.classList.remove("hidden");
         updateGenerateSummary();
     } catch (err) {
@@ -0,0 +1,138 @@
+"""Parity between CompanyIndex and the linear scan it replaced.
+
+For any query, CompanyIndex.search must return the same companies in the
+same order as filtering the whole ticker list: exact tickers, then
+starts-with, then contains, each in list order.
+"""
+
+import random
+import string
+
+import pytest
+
+import company_search
+
+WORDS = (
+    "apple micro soft berkshire hathaway alpha beta capital global holdings energy pharma bio therapeutics "
+    "bank financial trust realty semiconductor systems networks american first national united tesla motors "
+    "amazon meta platforms nvidia acquisition partners resources gold mining oil gas technologies software "
+    "health care medical devices insurance services s&p 500 etf"
+).split()
+SUFFIXES = ["Inc.", "Corp", "Corporation", "Ltd", "Holdings, Inc.", "Co", "Group Inc", "LP", "Trust", "PLC", "N.V.", "S.A."]
+
+
+def _linear_search(companies, query, limit=15):
+    """The per-keystroke scan search_company used before CompanyIndex."""
+    query_lower = query.lower().strip()
+    if not query_lower:
+        return []
+
+    exact_ticker = []
+    starts_with = []
+    contains = []
+
+    for co in companies:
+        ticker_lower = co["ticker"].lower()
+        name_lower = co["name"].lower()
+
+        if ticker_lower == query_lower:
+            exact_ticker.append(co)
+        elif ticker_lower.startswith(query_lower) or name_lower.startswith(query_lower):
+            starts_with.append(co)
+        elif query_lower in ticker_lower or query_lower in name_lower:
+            contains.append(co)
+
+    results = exact_ticker + starts_with + contains
+    return results[:limit]
+
+
+def _companies(seed, count=5000):
+    """A ticker list shaped like SEC's: share classes, repeated tickers and names."""
+    r = random.Random(seed)
+    companies = []
+    for i in range(count):
+        name = " ".join(w.title() for w in r.sample(WORDS, r.randint(1, 3))) + " " + r.choice(SUFFIXES)
+        ticker = "".join(r.choice(string.ascii_uppercase) for _ in range(r.randint(1, 5)))
+        if r.random() < 0.03:
+            ticker += "-" + r.choice("ABWU")
+        if companies and r.random() < 0.02:
+            # another share class or a relisting of an earlier company
+            other = r.choice(companies)
+            ticker, name = (other["ticker"], name) if r.random() < 0.5 else (ticker, other["name"])
+        companies.append({"cik": str(1000 + i), "ticker": ticker, "name": name})
+    companies[10] = {"cik": "320193", "ticker": "AAPL", "name": "Apple Inc."}
+    companies[11] = {"cik": "1067983", "ticker": "BRK-B", "name": "BERKSHIRE HATHAWAY INC"}
+    companies[12] = {"cik": "1067983", "ticker": "BRK-A", "name": "BERKSHIRE HATHAWAY INC"}
+    companies[13] = {"cik": "1045810", "ticker": "NVDA", "name": "NVIDIA CORP"}
+    companies[14] = {"cik": "884394", "ticker": "SPY", "name": "SPDR S&P 500 ETF TRUST"}
+    companies[15] = {"cik": "1234", "ticker": "NESN", "name": "Nestlé S.A."}
+    return companies
+
+
+@pytest.fixture(scope="module")
+def companies():
+    return _companies(0)
+
+
+@pytest.fixture(scope="module")
+def index(companies):
+    return company_search.CompanyIndex(companies)
+
+
+SHORT = ["a", "z", "q", "b", "ap", "rk", "-b", "&", ".", " ", "in", "nv", "é"]
+LONG = ["apple", "berkshire hath", "holdings, inc.", "s&p 500", "bank financial", "therapeutics corp", "nestlé s.a.",
+        "spdr s&p 500 etf trust", "realty trust"]
+MIXED_CASE = ["Apple", "aPPle INC.", "BeRkShIrE", "Nvidia Corp", "HOLDINGS", "Spdr S&P"]
+TICKERS = ["AAPL", "aapl", "BRK-B", "brk-a", "brk", "NVDA", "SPY", "nesn"]
+NO_MATCH = ["zzqx", "xyzzy corp", "apple!", "ℵ", "qqqqqq", "berkshire hathaway incorporated"]
+PADDED = ["  aapl  ", "\tapple", "", "   "]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [pytest.param(q, id=f"short-{q!r}") for q in SHORT]
+    + [pytest.param(q, id=f"long-{q!r}") for q in LONG]
+    + [pytest.param(q, id=f"mixed-{q!r}") for q in MIXED_CASE]
+    + [pytest.param(q, id=f"ticker-{q!r}") for q in TICKERS]
+    + [pytest.param(q, id=f"none-{q!r}") for q in NO_MATCH]
+    + [pytest.param(q, id=f"padded-{q!r}") for q in PADDED],
+)
+def test_matches_linear_search(companies, index, query):
+    assert index.search(query) == _linear_search(companies, query)
+
+
+def test_query_groups_find_what_they_should(companies, index):
+    # guards against parity holding only because both sides find nothing
+    assert all(index.search(q) for q in SHORT + LONG + MIXED_CASE + TICKERS if q.strip())
+    assert not any(index.search(q) for q in NO_MATCH + ["", "   "])
+    assert [co["ticker"] for co in index.search("brk-b")][:1] == ["BRK-B"]
+    assert index.search("aapl")[0]["cik"] == "320193"
+
+
+@pytest.mark.parametrize("limit", [1, 3, 15, 100, 10**6])
+def test_limit(companies, index, limit):
+    for query in ["a", "in", "hold", "inc", "AAPL", "berkshire"]:
+        assert index.search(query, limit=limit) == _linear_search(companies, query, limit=limit)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_keystroke_trace(seed):
+    # every prefix of typed queries, as the search box sends them
+    r = random.Random(seed)
+    companies = _companies(seed, count=2000)
+    index = company_search.CompanyIndex(companies)
+    alphabet = string.ascii_letters + " .-&"
+    for _ in range(150):
+        if r.random() < 0.5:
+            typed = r.choice(companies)[r.choice(["ticker", "name"])]
+        else:
+            typed = "".join(r.choice(alphabet) for _ in range(r.randint(1, 8)))
+        for end in range(1, len(typed) + 1):
+            query = typed[:end]
+            assert index.search(query) == _linear_search(companies, query), query
+
+
+def test_empty_list():
+    index = company_search.CompanyIndex([])
+    assert len(index) == 0
+    assert index.search("apple") == []
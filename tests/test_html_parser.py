@@ -0,0 +1,190 @@
+"""Parity between the table extractors.
+
+extract_tables(engine="lxml"), extract_tables(engine="bs4") and the
+streaming iter_tables must return the same tables, titles included, for
+the same document however its bytes are chunked.
+"""
+
+import random
+
+import pytest
+
+import html_parser
+
+# bs4 warns about the XML declaration that EDGAR documents start with
+pytestmark = pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+
+TABLE = "<table><tr><td>A</td><td>1</td></tr><tr><td>B%d</td><td>2</td></tr><tr><td>C</td><td>3</td></tr></table>"
+
+EDGE_DOCUMENTS = [
+    # text straight before the table, no element around it
+    "<html><body>Intro text here" + TABLE % 0 + "</body></html>",
+    # a comment between the title and the table
+    "<body><p>Debt schedule</p><!---->" + TABLE % 0 + "</body>",
+    # script and style between the heading and a spanning title cell
+    '<body><h2>Segments</h2>x<script>var a;</script>  <style>p{}</style>\n<table><tr><td colspan="3">Title cell here</td></tr>'
+    "<tr><td>B</td><td>2</td></tr><tr><td>C</td><td>3</td></tr><tr><td>D</td><td>3</td></tr></table></body>",
+    # hr stops the title search; header row, negatives and percentages
+    "<body><div><hr/><table><tr><th>h</th><th>2024</th></tr><tr><td>rev</td><td>(1,2)</td></tr>"
+    "<tr><td>cost</td><td>5%</td></tr><tr><td>z</td><td>9</td></tr></table></div></body>",
+    # a table nested in a table
+    "<body><table><tr><td><table><tr><td>in</td><td>1</td></tr><tr><td>x</td><td>2</td></tr><tr><td>y</td><td>3</td></tr></table></td></tr>"
+    "<tr><td>o</td><td>4</td></tr></table></body>",
+    # more finished siblings in one container than the stream keeps
+    "<body><div>" + "".join("<p>Debt schedule %02d</p>" % i for i in range(15)) + TABLE % 0 + "</div></body>",
+    # the same table twice, once under a different title
+    "<body><p><b>Leases</b></p>" + TABLE % 7 + "<p><b>Leases, again</b></p>" + TABLE % 7 + "</body>",
+    "",
+    "   ",
+    "<p>no tables</p>",
+]
+
+
+def _filing(seed, n_tables=30):
+    """A filing-like document: titled tables in divs, with the usual clutter."""
+    r = random.Random(seed)
+    titles = ["Consolidated Statements of Operations", "Revenue by segment", "Long-term debt", "Income tax provision", "Leases"]
+    labels = ["Net sales", "Cost of sales", "Goodwill", "Senior notes", "Deferred tax", "United States", "Total", "Inventory"]
+    values = ["$ 1,234", "(56)", "12.5%", "—", "7,890", " ", "3"]
+    parts = ['<?xml version="1.0" encoding="utf-8"?><html><head><style>p{}</style><script>var x=1;</script></head><body>']
+    for t in range(n_tables):
+        if r.random() < 0.6:
+            parts.append("<div><p><b>%s</b></p>\n" % r.choice(titles))
+        else:
+            parts.append("<div><span>Note %d</span>\n" % t)
+        if r.random() < 0.2:
+            parts.append("<!-- c -->text before\n")
+        parts.append("<table>")
+        if r.random() < 0.5:
+            parts.append('<tr><th>Item</th><th colspan="2">2024</th><th>2023</th></tr>')
+        else:
+            parts.append("<tr><td>(in millions)</td><td>Year&#160;2024</td><td>2023</td></tr>")
+        for i in range(12 if r.random() < 0.9 else 1):
+            cells = "".join("<td>%s</td>" % r.choice(values) for _ in range(3))
+            parts.append("<tr><td>%s <span>%d</span></td>%s</tr>" % (r.choice(labels), i, cells))
+        parts.append("</table>tail text</div>\n")
+        if r.random() < 0.1:
+            parts.append(parts[-1])
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _nested(seed):
+    """Tables at random depths among paragraphs, comments and headings."""
+    r = random.Random(seed)
+
+    def block(depth):
+        parts = []
+        for i in range(r.randint(0, 18)):
+            c = r.random()
+            if c < 0.35:
+                parts.append("<p>%s %d</p>" % (r.choice(["Debt schedule", "Tax", "Note", "x"]), i) + r.choice(["", " tail ", "\n"]))
+            elif c < 0.45:
+                parts.append("<!-- c%d -->" % i + r.choice(["", "after"]))
+            elif c < 0.55:
+                parts.append(r.choice(["<b>Income statement</b>", "<span>Leases</span>", "<hr/>"]))
+            elif c < 0.75 and depth < 3:
+                parts.append("<div>%s</div>" % block(depth + 1))
+            else:
+                parts.append(TABLE % r.randint(0, 10**6))
+        return "".join(parts)
+
+    return "<html><body>" + block(0) + "</body></html>"
+
+
+DOCUMENTS = (
+    [pytest.param(html, id=f"edge{i}") for i, html in enumerate(EDGE_DOCUMENTS)]
+    + [pytest.param(_filing(seed), id=f"filing{seed}") for seed in range(5)]
+    + [pytest.param(_nested(seed), id=f"nested{seed}") for seed in range(40)]
+)
+
+
+def _streamed(html, chunk_size):
+    data = html.encode("utf-8")
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    return list(html_parser.iter_tables(chunks, "utf-8"))
+
+
+@pytest.mark.parametrize("html", DOCUMENTS)
+def test_lxml_matches_bs4(html):
+    assert html_parser.extract_tables(html, engine="lxml") == html_parser.extract_tables(html, engine="bs4")
+
+
+@pytest.mark.parametrize("chunk_size", [61, 777, 65536])
+@pytest.mark.parametrize("html", DOCUMENTS)
+def test_iter_tables_matches_extract_tables(html, chunk_size):
+    assert _streamed(html, chunk_size) == html_parser.extract_tables(html)
+
+
+def test_edge_documents_find_tables():
+    # guards against parity holding only because every engine finds nothing
+    titles = [[t["title"] for t in html_parser.extract_tables(html)] for html in EDGE_DOCUMENTS]
+    assert titles[0] == ["Intro text here"]
+    assert titles[1] == ["Debt schedule"]
+    assert titles[5] == ["Debt schedule 14"]
+    assert titles[-3:] == [[], [], []]
+
+
+# ─── Title keyword matching ───
+#
+# The title keywords are matched with one compiled trie per keyword set
+# (_keyword_regex). These references are the plain substring checks it
+# replaced; over a corpus of phrases made from overlapping keywords, glued
+# together and cut mid-word, the titles must not change.
+
+def _reference_title_from_content(headers, rows):
+    combined = " ".join([cell.lower() for row in headers for cell in row] + [row[0].lower() for row in rows if row])
+    best_match, best_count = None, 0
+    for keywords, title in html_parser._CONTENT_PATTERNS:
+        count = sum(1 for kw in keywords if kw in combined)
+        if count > best_count:
+            best_match, best_count = title, count
+    if best_match:
+        return best_match
+    labels = [row[0] for row in rows[:10] if row and row[0] and not html_parser._is_numeric(row[0]) and len(row[0]) > 2]
+    if labels and len(min(labels, key=len)) <= 60:
+        return f"Data: {min(labels, key=len)}..."
+    return None
+
+
+def _reference_title_keyword(text):
+    lower = text.lower()
+    return any(kw in lower for kw in html_parser._TITLE_KEYWORDS)
+
+
+def _keyword_phrases(seed, count):
+    r = random.Random(seed)
+    vocab = sorted({kw for keywords, _ in html_parser._CONTENT_PATTERNS for kw in keywords} | set(html_parser._TITLE_KEYWORDS))
+    vocab += "total net of the and other level 10 restore steps taxes deferred long-term notes due".split()
+
+    def fragment():
+        word = r.choice(vocab)
+        if r.random() < 0.2:  # cut a keyword short or start it late
+            cut = r.randint(1, len(word))
+            word = word[:cut] if r.random() < 0.5 else word[cut - 1:]
+        return word
+
+    phrases = []
+    for _ in range(count):
+        sep = r.choice([" ", "", "-", ", "])
+        phrase = sep.join(fragment() for _ in range(r.randint(1, 4)))
+        phrases.append(phrase.title() if r.random() < 0.3 else phrase)
+    return phrases
+
+
+def test_content_titles_match_reference():
+    phrases = _keyword_phrases(0, 40000)
+    r = random.Random(1)
+    for _ in range(4000):
+        headers = [[phrases.pop() for _ in range(r.randint(0, 3))] for _ in range(r.randint(0, 2))]
+        rows = [[phrases.pop() if r.random() < 0.8 else "1,234", "5"] for _ in range(r.randint(2, 6))]
+        expected = _reference_title_from_content(headers, rows)
+        assert html_parser._infer_title_from_content(headers, rows) == expected, (headers, rows)
+
+
+@pytest.mark.parametrize("tag_name", ["p", "div", "span"])
+def test_sibling_titles_match_reference(tag_name):
+    for text in _keyword_phrases(2, 20000):
+        clean = html_parser._clean_text(text)
+        expected = clean if 3 < len(clean) < 200 and _reference_title_keyword(clean) else None
+        assert html_parser._title_from_sibling_text(tag_name, text) == expected, text
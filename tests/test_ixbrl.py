@@ -0,0 +1,231 @@
+"""Inline XBRL facts gathered while extracting tables.
+
+FactCollector must read ix:nonFraction values the way companyfacts reports
+them (scale, sign and the ixt transformation formats applied), keep only
+facts whose context has no dimensions, and collect the same facts whether
+it is fed a streamed document or a parsed one.
+"""
+
+import random
+
+import pytest
+
+import html_parser
+import ixbrl
+
+FY_START, FY_END = "2023-10-01", "2024-09-28"
+PRIOR_START, PRIOR_END = "2022-09-25", "2023-09-30"
+
+
+def _context(context_id, period, dimension=None):
+    entity = '<xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier>'
+    if dimension:
+        entity += (
+            f"<xbrli:{dimension}><xbrldi:explicitMember dimension=\"srt:ProductOrServiceAxis\">"
+            f"us-gaap:ProductMember</xbrldi:explicitMember></xbrli:{dimension}>"
+        )
+    if isinstance(period, tuple):
+        period = f"<xbrli:startDate>{period[0]}</xbrli:startDate><xbrli:endDate>{period[1]}</xbrli:endDate>"
+    else:
+        period = f"<xbrli:instant>{period}</xbrli:instant>"
+    return (
+        f'<xbrli:context id="{context_id}"><xbrli:entity>{entity}</xbrli:entity>'
+        f"<xbrli:period>{period}</xbrli:period></xbrli:context>"
+    )
+
+
+RESOURCES = (
+    "<ix:resources>"
+    + _context("c-fy", (FY_START, FY_END))
+    + _context("c-prior", (PRIOR_START, PRIOR_END))
+    + _context("c-end", FY_END)
+    + _context("c-prior-end", PRIOR_END)
+    + _context("c-segment", (FY_START, FY_END), dimension="segment")
+    + _context("c-scenario", FY_END, dimension="scenario")
+    + '<xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>'
+    + '<xbrli:unit id="shares"><xbrli:measure>xbrli:shares</xbrli:measure></xbrli:unit>'
+    + '<xbrli:unit id="usdPerShare"><xbrli:divide>'
+    + "<xbrli:unitNumerator><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unitNumerator>"
+    + "<xbrli:unitDenominator><xbrli:measure>xbrli:shares</xbrli:measure></xbrli:unitDenominator>"
+    + "</xbrli:divide></xbrli:unit>"
+    + "</ix:resources>"
+)
+
+
+def _fact(name, context, unit, text, **attrs):
+    attrs = "".join(f' {key.replace("_", ":")}="{value}"' for key, value in attrs.items())
+    return f'<ix:nonFraction name="{name}" contextRef="{context}" unitRef="{unit}"{attrs}>{text}</ix:nonFraction>'
+
+
+def _document(body, header_last=False):
+    """An inline XBRL filing with the hidden ix:header before or after body."""
+    header = f'<div style="display:none"><ix:header>{RESOURCES}</ix:header></div>'
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL">'
+        "<head><title>10-K</title></head><body>"
+        + ("" if header_last else header) + body + (header if header_last else "")
+        + "</body></html>"
+    )
+
+
+def _collected(html):
+    facts = ixbrl.FactCollector()
+    html_parser.extract_tables(html, facts=facts)
+    return facts.company_facts(form="10-K", filed="2024-11-01", accession="0000320193-24-000123")
+
+
+def _value(text, **attrs):
+    """The value FactCollector reads from one fact, or None if it drops it."""
+    facts = _collected(_document("<p>" + _fact("us-gaap:Revenues", "c-fy", "usd", text, **attrs) + "</p>"))
+    entries = facts["facts"].get("us-gaap", {}).get("Revenues", {"units": {"USD": []}})["units"]["USD"]
+    return entries[0]["val"] if entries else None
+
+
+@pytest.mark.parametrize(
+    "text, attrs, expected",
+    [
+        ("391,035", {}, 391035),
+        ("6.11", {}, 6.11),
+        ("<span>93,</span>736", {}, 93736),
+        ("$ 1,234", {}, 1234),
+        # scale
+        ("391,035", {"scale": "6"}, 391035000000),
+        ("1.5", {"scale": "3"}, 1500),
+        ("25", {"scale": "-2"}, 0.25),
+        ("7", {"scale": "0"}, 7),
+        # sign
+        ("269", {"sign": "-", "scale": "6"}, -269000000),
+        ("0.5", {"sign": "-"}, -0.5),
+        # transformation formats
+        ("1,234.56", {"format": "ixt:num-dot-decimal"}, 1234.56),
+        ("1,234.56", {"format": "ixt:numdotdecimal"}, 1234.56),
+        ("31.370,5", {"format": "ixt:num-comma-decimal", "scale": "6"}, 31370500000),
+        ("1.234,5", {"format": "ixt:numcommadecimal"}, 1234.5),
+        ("1 234,5", {"format": "ixt:numspacecomma"}, 1234.5),
+        ("1.234,5", {"format": "ixt:numdotcomma"}, 1234.5),
+        ("—", {"format": "ixt:fixed-zero"}, 0),
+        ("-", {"format": "ixt:fixed-zero", "scale": "6"}, 0),
+        ("–", {"format": "ixt:zerodash"}, 0),
+        ("nil", {"format": "ixt:fixedzero", "sign": "-"}, 0),
+        ("three", {"format": "ixt-sec:numwordsen"}, 3),
+        ("No", {"format": "ixt-sec:numwordsen"}, 0),
+        ("none", {"format": "ixt-sec:num-word-en"}, 0),
+        ("two", {"format": "ixt-sec:numwordsen", "scale": "3"}, 2000),
+        ("Ten", {"format": "IXT-SEC:NUMWORDSEN"}, 10),
+        # nothing a number can be read from
+        ("eleven", {"format": "ixt-sec:numwordsen"}, None),
+        ("", {}, None),
+        ("—", {}, None),
+        ("12", {"xsi_nil": "true"}, None),
+        ("1.2.3", {}, None),
+    ],
+)
+def test_fact_value(text, attrs, expected):
+    value = _value(text, **attrs)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+def test_dimensional_contexts_are_excluded():
+    body = "<table><tr><td>Net sales</td><td>" + "</td><td>".join([
+        _fact("us-gaap:Revenues", "c-fy", "usd", "391,035"),
+        _fact("us-gaap:Revenues", "c-segment", "usd", "294,866"),
+        _fact("us-gaap:Assets", "c-scenario", "usd", "1"),
+        _fact("us-gaap:Liabilities", "c-segment", "usd", "2"),
+    ]) + "</td></tr></table>"
+    facts = _collected(_document(body))["facts"]["us-gaap"]
+
+    assert [e["val"] for e in facts["Revenues"]["units"]["USD"]] == [391035]
+    assert "Assets" not in facts and "Liabilities" not in facts
+
+
+def test_duration_and_instant_periods():
+    body = "<p>" + "".join([
+        _fact("us-gaap:Revenues", "c-fy", "usd", "391,035"),
+        _fact("us-gaap:Revenues", "c-prior", "usd", "383,285"),
+        _fact("us-gaap:Assets", "c-end", "usd", "364,980"),
+        _fact("us-gaap:Assets", "c-prior-end", "usd", "352,583"),
+        _fact("us-gaap:EarningsPerShareBasic", "c-fy", "usdPerShare", "6.11"),
+        _fact("dei:EntityCommonStockSharesOutstanding", "c-end", "shares", "15,115,823,000"),
+    ]) + "</p>"
+    facts = _collected(_document(body))["facts"]
+    common = {"accn": "0000320193-24-000123", "form": "10-K", "filed": "2024-11-01"}
+
+    # durations carry start and end, instants only end; both oldest first
+    assert facts["us-gaap"]["Revenues"]["units"]["USD"] == [
+        dict(start=PRIOR_START, end=PRIOR_END, val=383285, **common),
+        dict(start=FY_START, end=FY_END, val=391035, **common),
+    ]
+    assert facts["us-gaap"]["Assets"]["units"]["USD"] == [
+        dict(end=PRIOR_END, val=352583, **common),
+        dict(end=FY_END, val=364980, **common),
+    ]
+    assert facts["us-gaap"]["EarningsPerShareBasic"]["units"] == {"USD/shares": [dict(start=FY_START, end=FY_END, val=6.11, **common)]}
+    assert facts["dei"]["EntityCommonStockSharesOutstanding"]["units"] == {"shares": [dict(end=FY_END, val=15115823000, **common)]}
+
+
+def test_repeated_fact_is_kept_once():
+    body = "".join("<p>" + _fact("us-gaap:Revenues", "c-fy", "usd", text) + "</p>" for text in ["391,035", "391,035", "1"])
+    facts = _collected(_document(body))["facts"]["us-gaap"]
+    assert [e["val"] for e in facts["Revenues"]["units"]["USD"]] == [391035]
+
+
+def test_unknown_context_or_unit_is_dropped():
+    body = "<p>" + _fact("us-gaap:Revenues", "c-missing", "usd", "1") + _fact("us-gaap:Assets", "c-end", "eur", "2") + "</p>"
+    assert _collected(_document(body)) == {"facts": {}}
+
+
+def test_document_without_inline_xbrl():
+    assert _collected("<html><body><table><tr><td>a</td><td>1</td></tr></table></body></html>") == {"facts": {}}
+
+
+def test_bs4_engine_refuses_facts():
+    with pytest.raises(ValueError):
+        html_parser.extract_tables(_document("<p></p>"), engine="bs4", facts=ixbrl.FactCollector())
+
+
+# ─── Streamed vs whole-document collection ───
+
+def _filing(seed, header_last=False):
+    """A statement table plus notes, facts in every context and format."""
+    r = random.Random(seed)
+    concepts = ["Revenues", "CostOfRevenue", "NetIncomeLoss", "Assets", "Liabilities", "StockholdersEquity"]
+    cells = [
+        lambda c: _fact(f"us-gaap:{c}", r.choice(["c-fy", "c-prior"]), "usd", f"{r.randint(1, 999999):,}", scale=6),
+        lambda c: _fact(f"us-gaap:{c}", r.choice(["c-end", "c-prior-end"]), "usd", f"{r.randint(1, 999):,}", sign="-"),
+        lambda c: _fact(f"us-gaap:{c}", "c-segment", "usd", f"{r.randint(1, 999):,}"),
+        lambda c: _fact(f"us-gaap:{c}", "c-scenario", "usd", "5"),
+        lambda c: _fact(f"us-gaap:{c}", "c-fy", "usd", "—", format="ixt:fixed-zero"),
+        lambda c: _fact(f"us-gaap:{c}", "c-prior", "usd", "12.345,6", format="ixt:num-comma-decimal"),
+        lambda c: _fact(f"us-gaap:{c}", "c-end", "shares", r.choice(["one", "two", "none"]), format="ixt-sec:numwordsen"),
+        lambda c: _fact(f"us-gaap:{c}PerShare", "c-fy", "usdPerShare", "<span>1.</span>%02d" % r.randint(0, 99)),
+    ]
+    parts = ["<p><b>CONSOLIDATED STATEMENTS OF OPERATIONS</b></p>"]
+    for t in range(12):
+        parts.append(f"<div><p>Note {t}</p><table><tr><th></th><th>2024</th><th>2023</th></tr>")
+        for i in range(r.randint(3, 8)):
+            concept = r.choice(concepts) + str(r.randint(0, 20))
+            parts.append(f"<tr><td>Item {t}-{i}</td><td>$ {r.choice(cells)(concept)}</td><td>{r.randint(1, 9999):,}</td></tr>")
+        parts.append("</table></div>")
+    return _document("".join(parts), header_last=header_last)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 61, 4096, 1 << 30])
+@pytest.mark.parametrize("header_last", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_streamed_facts_match_whole_document(seed, header_last, chunk_size):
+    html = _filing(seed, header_last)
+    data = html.encode("utf-8")
+
+    whole = ixbrl.FactCollector()
+    tables = html_parser.extract_tables(html, facts=whole)
+    streamed = ixbrl.FactCollector()
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    streamed_tables = list(html_parser.iter_tables(chunks, "utf-8", facts=streamed))
+
+    assert streamed_tables == tables
+    assert len(streamed) == len(whole)
+    assert streamed.company_facts() == whole.company_facts()
+    # guards against parity holding only because nothing was collected
+    assert len(whole.company_facts()["facts"]["us-gaap"]) > 10
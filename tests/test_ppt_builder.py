@@ -0,0 +1,97 @@
+"""Logo fetching against a local stub server.
+
+_fetch_logos fetches concurrently, so a deck waits about as long as its
+slowest logo, and never much past the deadline it is given.
+"""
+
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import disk_cache
+import ppt_builder
+
+FAST = 0.2  # seconds each ordinary logo takes
+
+
+def _png():
+    out = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(out, "PNG")
+    return out.getvalue()
+
+
+class _LogoHandler(BaseHTTPRequestHandler):
+    """Serves a PNG for /<domain>; "slow-<seconds>.com" takes that long."""
+
+    png = _png()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        domain = self.path.strip("/")
+        if domain.startswith("slow-"):
+            time.sleep(float(domain[len("slow-"):-len(".com")]))
+        else:
+            time.sleep(FAST)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(self.png)))
+        self.end_headers()
+        self.wfile.write(self.png)
+
+
+@pytest.fixture
+def logo_server(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LogoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ppt_builder, "LOGO_URL", f"http://127.0.0.1:{server.server_address[1]}/{{domain}}")
+    monkeypatch.setattr(ppt_builder, "_logo_store", disk_cache.DiskCache(str(tmp_path / "logos"), 1 << 24))
+    monkeypatch.setattr(ppt_builder, "_processed_store", disk_cache.DiskCache(str(tmp_path / "processed"), 1 << 24))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _timed_fetch(domains, deadline):
+    start = time.perf_counter()
+    logos = ppt_builder._fetch_logos(domains, deadline=deadline)
+    return logos, time.perf_counter() - start
+
+
+def test_wall_time_tracks_slowest_logo(logo_server):
+    domains = [f"fast{i}.com" for i in range(10)] + ["slow-1.0.com"]
+    logos, elapsed = _timed_fetch(domains, deadline=ppt_builder.LOGO_DEADLINE)
+
+    assert all(logos[d] for d in domains)
+    # one slow logo, not the sum of all of them (3 s one after the other)
+    assert 1.0 <= elapsed < 1.0 + 3 * FAST
+
+
+def test_deadline_cuts_off_slow_logo(logo_server):
+    domains = [f"fast{i}.com" for i in range(10)] + ["slow-3.0.com"]
+    logos, elapsed = _timed_fetch(domains, deadline=0.8)
+
+    assert elapsed < 0.8 + 3 * FAST
+    assert logos["slow-3.0.com"] is None
+    assert all(logos[f"fast{i}.com"] for i in range(10))
+
+    # the straggler still lands in the logo store for the next deck
+    deadline = time.monotonic() + 5
+    while ppt_builder._cached_logo("slow-3.0.com") == (False, None) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert ppt_builder._cached_logo("slow-3.0.com")[1]
+
+
+def test_cached_logos_skip_the_network(logo_server):
+    domains = [f"fast{i}.com" for i in range(5)]
+    first, _ = _timed_fetch(domains, deadline=ppt_builder.LOGO_DEADLINE)
+    second, elapsed = _timed_fetch(domains, deadline=ppt_builder.LOGO_DEADLINE)
+
+    assert second == first
+    assert elapsed < FAST
@@ -0,0 +1,278 @@
+"""sec_client's fetching and companyfacts decoding.
+
+Against a local stub server, concurrent fetches of one URL share a single
+download (_Flight), and no way a fetch can end, abandoned or failed,
+leaves the URL locked.
+"""
+
+import gc
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import disk_cache
+import sec_client
+
+DELAY = 0.3  # seconds the server takes before answering
+BODY = b"x" * (256 * 1024)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves BODY after DELAY; the first request for /flaky is dropped."""
+
+    hits = Counter()
+    hits_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.hits_lock:
+            self.hits[self.path] += 1
+            first = self.hits[self.path] == 1
+        time.sleep(DELAY)
+        if self.path == "/flaky" and first:
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    _StubHandler.hits.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(sec_client, "_http_cache", disk_cache.DiskCache(str(tmp_path / "http"), 1 << 26))
+    monkeypatch.setattr(sec_client, "FLIGHT_LOCK_DIR", str(tmp_path / "locks"))
+    monkeypatch.setattr(sec_client, "RATE_LIMIT_FILE", str(tmp_path / "ratelimit"))
+    monkeypatch.setattr(sec_client, "RATE_LIMIT_PER_SEC", 1000.0)
+    monkeypatch.setattr(sec_client, "RATE_LIMIT_BURST", 100.0)
+    # long enough that a leaked lock shows up as a slow test, not a pass
+    monkeypatch.setattr(sec_client, "SINGLE_FLIGHT_WAIT", 10)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _in_threads(n, fn):
+    """Run fn in n threads at once. Returns (results, errors, seconds)."""
+    results, errors = [], []
+    barrier = threading.Barrier(n)
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors, time.perf_counter() - start
+
+
+def _assert_unlocked():
+    assert sec_client._flights == {}
+    assert sec_client._stripes == {}
+
+
+def test_concurrent_gets_share_one_download(server):
+    results, errors, elapsed = _in_threads(8, lambda: sec_client._get(server + "/doc").content)
+
+    assert errors == []
+    assert results == [BODY] * 8
+    assert _StubHandler.hits["/doc"] == 1
+    assert elapsed < 2 * DELAY + 1
+    _assert_unlocked()
+
+
+def test_concurrent_streams_share_one_download(server):
+    def stream():
+        chunks, _, _ = sec_client._open_stream(server + "/doc")
+        return b"".join(chunks)
+
+    results, errors, _ = _in_threads(8, stream)
+
+    assert errors == []
+    assert results == [BODY] * 8
+    assert _StubHandler.hits["/doc"] == 1
+    _assert_unlocked()
+
+
+@pytest.mark.parametrize("read_chunks", [0, 1])
+def test_abandoned_stream_does_not_block_next_fetch(server, read_chunks):
+    chunks, _, _ = sec_client._open_stream(server + "/doc")
+    for _ in range(read_chunks):
+        next(chunks)
+    del chunks
+    gc.collect()
+
+    start = time.perf_counter()
+    resp = sec_client._get(server + "/doc")
+    elapsed = time.perf_counter() - start
+
+    assert resp.content == BODY
+    # a half-read body never reaches the cache, so this is a second download
+    assert _StubHandler.hits["/doc"] == 2
+    assert elapsed < DELAY + 1
+    _assert_unlocked()
+
+
+def test_leader_failure_releases_waiters(server):
+    results, errors, elapsed = _in_threads(6, lambda: sec_client._get(server + "/flaky").content)
+
+    # the leader's download fails; one waiter fetches again, the rest share it
+    assert len(errors) == 1 and isinstance(errors[0], requests.ConnectionError)
+    assert results == [BODY] * 5
+    assert _StubHandler.hits["/flaky"] == 2
+    assert elapsed < 3 * DELAY + 1
+    _assert_unlocked()
+
+
+# ─── Selective companyfacts decoding ───
+#
+# _decode_selected_facts scans the raw payload for concept keys instead of
+# decoding it. Whatever the chunking or layout, it must return what
+# json.loads followed by picking out the wanted concepts would.
+
+WANTED = {"Revenues", "NetIncomeLoss", "Assets", "EntityCommonStockSharesOutstanding", "NotInPayload"}
+
+
+def _companyfacts(seed=0, n_concepts=40):
+    """A companyfacts payload with dei, us-gaap and srt facts."""
+    r = random.Random(seed)
+
+    def units(n):
+        return {
+            "USD": [
+                {
+                    "start": "%d-01-01" % year,
+                    "end": "%d-12-31" % year,
+                    "val": r.randint(-10**9, 10**11),
+                    "accn": "0000320193-%02d-%06d" % (year % 100, r.randint(0, 999999)),
+                    "fy": year,
+                    "fp": "FY",
+                    "form": r.choice(["10-K", "10-K/A", "10-Q"]),
+                    "filed": "%d-02-01" % (year + 1),
+                    **({"frame": "CY%d" % year} if r.random() < 0.5 else {}),
+                }
+                for year in range(2024 - n, 2024)
+            ]
+        }
+
+    def concept(name):
+        return {
+            "label": r.choice([name, 'Revenue, "net" of returns', "Café — 日本", 'ends in a quote "', "\\ back\\slash"]),
+            "description": r.choice(["Plain.", 'Looks like a key ":{"label": but is text.', "Line\nbreak and \t tab.", None]),
+            "units": units(r.randint(1, 6)),
+        }
+
+    us_gaap = ["Concept%03d" % i for i in range(n_concepts)] + ["Revenues", "NetIncomeLoss", "Assets"]
+    r.shuffle(us_gaap)
+    return {
+        "cik": 320193,
+        "entityName": "Apple Inc.",
+        "facts": {
+            "dei": {"EntityCommonStockSharesOutstanding": concept("Shares"), "EntityPublicFloat": concept("Float")},
+            "us-gaap": {name: concept(name) for name in us_gaap},
+            "srt": {"Revenues": concept("srt revenues")},
+        },
+    }
+
+
+def _expected(data, concepts=WANTED, taxonomy="us-gaap"):
+    facts = data["facts"][taxonomy]
+    return {
+        "cik": data["cik"],
+        "entityName": data["entityName"],
+        "facts": {taxonomy: {c: facts[c] for c in facts if c in concepts}},
+    }
+
+
+def _compact(data, ensure_ascii=True):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=ensure_ascii).encode("utf-8")
+
+
+def _chunked(payload, size):
+    return (payload[i:i + size] for i in range(0, len(payload), size))
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 11, 63, 64, 65, 4096, 1 << 30])
+def test_selected_facts_match_json_loads(chunk_size, ensure_ascii):
+    data = _companyfacts()
+    payload = _compact(data, ensure_ascii)
+    decoded = sec_client._decode_selected_facts(_chunked(payload, chunk_size), WANTED)
+
+    assert decoded == _expected(json.loads(payload))
+    # guards against parity holding only because nothing was picked out
+    assert set(decoded["facts"]["us-gaap"]) == {"Revenues", "NetIncomeLoss", "Assets"}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_selected_facts_other_taxonomy(seed):
+    data = _companyfacts(seed)
+    decoded = sec_client._decode_selected_facts(_chunked(_compact(data), 97), WANTED, taxonomy="dei")
+
+    assert decoded == _expected(data, taxonomy="dei")
+    assert list(decoded["facts"]["dei"]) == ["EntityCommonStockSharesOutstanding"]
+
+
+def test_selected_facts_marker_split_across_chunks():
+    data = _companyfacts(n_concepts=3)
+    payload = _compact(data)
+    expected = _expected(data)
+    markers = [m.start() for m in re.finditer(re.escape(sec_client._CONCEPT_MARKER), payload)]
+    assert len(markers) > 5
+
+    for at in markers:
+        # split inside the marker, and inside the concept key before it
+        for cut in range(at - 12, at + len(sec_client._CONCEPT_MARKER) + 1):
+            chunks = [payload[:cut], payload[cut:]]
+            assert sec_client._decode_selected_facts(chunks, WANTED) == expected, cut
+
+
+@pytest.mark.parametrize(
+    "dumps",
+    [
+        pytest.param(lambda d: json.dumps(d), id="default-separators"),
+        pytest.param(lambda d: json.dumps(d, indent=2), id="indented"),
+        pytest.param(lambda d: " \n" + json.dumps(d, indent="\t"), id="leading-whitespace"),
+        pytest.param(lambda d: json.dumps(d, separators=(",", ":")).replace('"facts":', '"facts": '), id="space-after-facts"),
+        pytest.param(lambda d: json.dumps({"entityName": d["entityName"], **d}, separators=(",", ":")), id="reordered-keys"),
+    ],
+)
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, 1 << 30])
+def test_selected_facts_reformatted_payload_falls_back(dumps, chunk_size):
+    data = _companyfacts(1)
+    payload = dumps(data).encode("utf-8")
+    decoded = sec_client._decode_selected_facts(_chunked(payload, chunk_size), WANTED)
+
+    assert decoded == _expected(data)
+    assert decoded["facts"]["us-gaap"]
+
+
+def test_selected_facts_nothing_wanted_or_no_facts():
+    data = _companyfacts(2)
+    assert sec_client._decode_selected_facts([_compact(data)], set()) == _expected(data, concepts=set())
+
+    empty = {"cik": 1, "entityName": "Shell Co", "facts": {}}
+    assert sec_client._decode_selected_facts([_compact(empty)], WANTED) == {
+        "cik": 1, "entityName": "Shell Co", "facts": {"us-gaap": {}},
+    }
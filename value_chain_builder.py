@@ -4,8 +4,7 @@ Ported from value-chain-generator.js layout engine to Python/python-pptx.
 Uses pre-built value chain data (no external API calls).
 """
 
-import os
-import tempfile
+import io
 from datetime import datetime
 
 from pptx import Presentation
@@ -902,15 +901,16 @@ def _add_summary_slide(prs, stages, palette):
 # MAIN GENERATOR
 # ============================================================================
 
-def build_value_chain_ppt(value_chain, scope="broad"):
+def build_value_chain_ppt(value_chain, scope="broad", output=None):
     """Build a value chain PowerPoint presentation.
 
     Args:
         value_chain: dict with 'name', 'broad' and/or 'narrow' keys
         scope: 'broad', 'narrow', or 'both'
+        output: path or writable binary file to save to (default: a new BytesIO)
 
     Returns:
-        (filepath, filename) tuple
+        (output, filename) tuple
     """
     prs = Presentation()
     prs.slide_width = Inches(SLIDE_W)
@@ -959,8 +959,8 @@ def build_value_chain_ppt(value_chain, scope="broad"):
     # Save
     safe_name = chain_name.replace("/", "-").replace("&", "and").replace(" ", "_")
     filename = f"{safe_name}_Value_Chain_{scope.title()}.pptx"
-    fd, filepath = tempfile.mkstemp(suffix=".pptx")
-    os.close(fd)
-    prs.save(filepath)
+    if output is None:
+        output = io.BytesIO()
+    prs.save(output)
 
-    return filepath, filename
+    return output, filename
@@ -1,5 +1,6 @@
 """Extract structured financial statements from SEC XBRL company facts JSON."""
 
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 
 # Mapping of XBRL concept names to readable labels, grouped by statement.
@@ -102,6 +103,22 @@ STATEMENTS = {
 }
 
 
+def statement_concepts(extra=None):
+    """us-gaap concept names read by extract_financials, plus any extras.
+
+    Pass this to sec_client.get_xbrl_facts so only these concepts are decoded.
+    """
+    names = []
+    for concepts in STATEMENTS.values():
+        for concept, _ in concepts:
+            if concept not in names:
+                names.append(concept)
+    for concept in extra or []:
+        if concept not in names:
+            names.append(concept)
+    return names
+
+
 def _parse_xbrl_date(date_str):
     """Parse a date string from XBRL data."""
     try:
@@ -110,56 +127,89 @@ def _parse_xbrl_date(date_str):
         return None
 
 
-def _get_fact_values(facts_data, concept, taxonomy="us-gaap"):
-    """Get all reported values for a given XBRL concept.
+# Facts match a filing when their form is in the filing's form group and
+# their period ends at most this many days before the filing date.
+_FORM_GROUPS = {
+    "10-K": ("10-K", "10-K/A"),
+    "10-Q": ("10-Q", "10-Q/A"),
+}
+_MAX_FILING_LAG_DAYS = {
+    "10-K": 120,
+    "10-Q": 90,
+}
+
+
+def _form_group(filing_type):
+    """Map a filing type (e.g. "10-K/A") to its form group, or None."""
+    for group in _FORM_GROUPS:
+        if filing_type.startswith(group):
+            return group
+    return None
+
+
+def build_fact_index(xbrl_facts, concepts, taxonomy="us-gaap"):
+    """Index facts for fast period matching.
 
-    Returns list of {value, end_date, start_date, form, filed, fy, fp, unit}.
+    Dates are parsed once here rather than on every comparison.
+
+    Returns {concept: {form_group: (end_ordinals, entries)}} where
+    end_ordinals is sorted and entries[i] is the (position, raw_fact) pair
+    ending on end_ordinals[i]. position is the fact's order in the payload,
+    used to pick the same fact a linear scan would.
     """
-    tax_data = facts_data.get("facts", {}).get(taxonomy, {})
-    concept_data = tax_data.get(concept, {})
-
-    results = []
-    for unit_key, unit_data in concept_data.get("units", {}).items():
-        for entry in unit_data:
-            results.append({
-                "value": entry.get("val"),
-                "end": entry.get("end", ""),
-                "start": entry.get("start", ""),
-                "form": entry.get("form", ""),
-                "filed": entry.get("filed", ""),
-                "fy": entry.get("fy"),
-                "fp": entry.get("fp", ""),
-                "unit": unit_key,
-            })
-    return results
-
-
-def _match_filing_period(fact, filing_date, filing_type):
-    """Check if a fact matches a specific filing period."""
-    fact_form = fact.get("form", "")
-    fact_end = fact.get("end", "")
-
-    # Match by form type and approximate date
-    if filing_type.startswith("10-K") and fact_form in ("10-K", "10-K/A"):
-        # For 10-K, end date should be close to filing period end
-        if fact_end:
-            end_dt = _parse_xbrl_date(fact_end)
-            filing_dt = _parse_xbrl_date(filing_date)
-            if end_dt and filing_dt:
-                # Filing end date should be within ~120 days before filing date
-                diff = (filing_dt - end_dt).days
-                if 0 <= diff <= 120:
-                    return True
-    elif filing_type.startswith("10-Q") and fact_form in ("10-Q", "10-Q/A"):
-        if fact_end:
-            end_dt = _parse_xbrl_date(fact_end)
-            filing_dt = _parse_xbrl_date(filing_date)
-            if end_dt and filing_dt:
-                diff = (filing_dt - end_dt).days
-                if 0 <= diff <= 90:
-                    return True
-
-    return False
+    tax_data = xbrl_facts.get("facts", {}).get(taxonomy, {})
+    form_to_group = {form: group for group, forms in _FORM_GROUPS.items() for form in forms}
+
+    index = {}
+    ordinals = {}  # end date string -> ordinal; dates repeat across facts
+    for concept in concepts:
+        if concept in index:
+            continue
+        by_group = {}
+        position = 0
+        for unit_data in tax_data.get(concept, {}).get("units", {}).values():
+            for entry in unit_data:
+                position += 1
+                group = form_to_group.get(entry.get("form", ""))
+                if group is None:
+                    continue
+                end = entry.get("end", "")
+                if end not in ordinals:
+                    end_dt = _parse_xbrl_date(end) if end else None
+                    ordinals[end] = end_dt.toordinal() if end_dt else None
+                if ordinals[end] is None:
+                    continue
+                by_group.setdefault(group, []).append((ordinals[end], position, entry))
+
+        index[concept] = {}
+        for group, rows in by_group.items():
+            rows.sort(key=lambda r: (r[0], r[1]))
+            index[concept][group] = (
+                [r[0] for r in rows],
+                [(r[1], r[2]) for r in rows],
+            )
+    return index
+
+
+def _find_period_fact(concept_index, filing_date, filing_type):
+    """Return the first raw fact with a value for this filing's period, or None."""
+    group = _form_group(filing_type)
+    if group is None or group not in concept_index:
+        return None
+    filing_dt = _parse_xbrl_date(filing_date)
+    if filing_dt is None:
+        return None
+
+    end_ordinals, entries = concept_index[group]
+    filing_ord = filing_dt.toordinal()
+    lo = bisect_left(end_ordinals, filing_ord - _MAX_FILING_LAG_DAYS[group])
+    hi = bisect_right(end_ordinals, filing_ord)
+
+    best = None
+    for position, fact in entries[lo:hi]:
+        if fact.get("val") is not None and (best is None or position < best[0]):
+            best = (position, fact)
+    return best[1] if best else None
 
 
 def extract_financials(xbrl_facts, selected_filings):
@@ -184,6 +234,7 @@ def extract_financials(xbrl_facts, selected_filings):
     """
     result = {}
     all_periods = set()
+    index = build_fact_index(xbrl_facts, statement_concepts())
 
     for statement_name, concepts in STATEMENTS.items():
         statement_data = {}
@@ -194,19 +245,17 @@ def extract_financials(xbrl_facts, selected_filings):
             if label in seen_labels:
                 continue
 
-            facts = _get_fact_values(xbrl_facts, concept_name)
-            if not facts:
+            concept_index = index[concept_name]
+            if not concept_index:
                 continue
 
             period_values = {}
             for filing in selected_filings:
-                for fact in facts:
-                    if _match_filing_period(fact, filing["date"], filing["type"]):
-                        period_key = fact.get("end", filing["date"])
-                        if fact["value"] is not None:
-                            period_values[period_key] = fact["value"]
-                            all_periods.add(period_key)
-                            break
+                fact = _find_period_fact(concept_index, filing["date"], filing["type"])
+                if fact is not None:
+                    period_key = fact.get("end", filing["date"])
+                    period_values[period_key] = fact["val"]
+                    all_periods.add(period_key)
 
             if period_values:
                 statement_data[label] = period_values